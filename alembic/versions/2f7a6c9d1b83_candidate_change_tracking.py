@@ -0,0 +1,102 @@
+"""Candidate change tracking
+
+Revision ID: 2f7a6c9d1b83
+Revises: 9c3d51e8f2a4
+Create Date: 2026-10-16 14:05:48.903215
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2f7a6c9d1b83"
+down_revision: Union[str, None] = "9c3d51e8f2a4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_UPGRADE = [
+    """
+    CREATE TRIGGER IF NOT EXISTS candidates_deletions_ad AFTER DELETE ON candidates
+    BEGIN
+        INSERT INTO candidate_deletions(candidate_id, deleted_at)
+        VALUES (old.id, CURRENT_TIMESTAMP);
+    END
+    """,
+]
+
+POSTGRES_UPGRADE = [
+    """
+    CREATE OR REPLACE FUNCTION record_candidate_deletion() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO candidate_deletions(candidate_id, deleted_at)
+        VALUES (OLD.id, now());
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER candidates_deletions_ad AFTER DELETE ON candidates
+    FOR EACH ROW EXECUTE FUNCTION record_candidate_deletion()
+    """,
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    # SQLite cannot add a column with a non constant default, existing rows
+    # get the epoch there, the first report after upgrading is a full one
+    # anyway. New rows get the current time from the model default.
+    server_default = (
+        sa.text("'1970-01-01 00:00:00'") if dialect == "sqlite" else sa.func.now()
+    )
+    op.add_column(
+        "candidates",
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=server_default,
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        op.f("ix_candidates_updated_at"), "candidates", ["updated_at"], unique=False
+    )
+    op.create_table(
+        "candidate_deletions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("candidate_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "deleted_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_candidate_deletions_deleted_at"),
+        "candidate_deletions",
+        ["deleted_at"],
+        unique=False,
+    )
+    for statement in SQLITE_UPGRADE if dialect == "sqlite" else POSTGRES_UPGRADE:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS candidates_deletions_ad ON candidates")
+        op.execute("DROP FUNCTION IF EXISTS record_candidate_deletion()")
+    else:
+        op.execute("DROP TRIGGER IF EXISTS candidates_deletions_ad")
+    op.drop_index(
+        op.f("ix_candidate_deletions_deleted_at"), table_name="candidate_deletions"
+    )
+    op.drop_table("candidate_deletions")
+    op.drop_index(op.f("ix_candidates_updated_at"), table_name="candidates")
+    op.drop_column("candidates", "updated_at")
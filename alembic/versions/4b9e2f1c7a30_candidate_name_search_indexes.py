@@ -0,0 +1,89 @@
+"""Candidate name search indexes
+
+Revision ID: 4b9e2f1c7a30
+Revises: ef3ffa5b6e42
+Create Date: 2026-10-16 09:12:31.482113
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4b9e2f1c7a30"
+down_revision: Union[str, None] = "ef3ffa5b6e42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_FTS_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS candidates_fts USING fts5(
+        first_name, last_name,
+        content='candidates', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS candidates_fts_ai AFTER INSERT ON candidates BEGIN
+        INSERT INTO candidates_fts(rowid, first_name, last_name)
+        VALUES (new.id, new.first_name, new.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS candidates_fts_ad AFTER DELETE ON candidates BEGIN
+        INSERT INTO candidates_fts(candidates_fts, rowid, first_name, last_name)
+        VALUES ('delete', old.id, old.first_name, old.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS candidates_fts_au AFTER UPDATE ON candidates BEGIN
+        INSERT INTO candidates_fts(candidates_fts, rowid, first_name, last_name)
+        VALUES ('delete', old.id, old.first_name, old.last_name);
+        INSERT INTO candidates_fts(rowid, first_name, last_name)
+        VALUES (new.id, new.first_name, new.last_name);
+    END
+    """,
+    "INSERT INTO candidates_fts(candidates_fts) VALUES ('rebuild')",
+]
+
+SQLITE_FTS_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS candidates_fts_au",
+    "DROP TRIGGER IF EXISTS candidates_fts_ad",
+    "DROP TRIGGER IF EXISTS candidates_fts_ai",
+    "DROP TABLE IF EXISTS candidates_fts",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index(
+            "ix_candidates_first_name_trgm",
+            "candidates",
+            ["first_name"],
+            postgresql_using="gin",
+            postgresql_ops={"first_name": "gin_trgm_ops"},
+        )
+        op.create_index(
+            "ix_candidates_last_name_trgm",
+            "candidates",
+            ["last_name"],
+            postgresql_using="gin",
+            postgresql_ops={"last_name": "gin_trgm_ops"},
+        )
+    elif dialect == "sqlite":
+        for statement in SQLITE_FTS_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.drop_index("ix_candidates_last_name_trgm", table_name="candidates")
+        op.drop_index("ix_candidates_first_name_trgm", table_name="candidates")
+    elif dialect == "sqlite":
+        for statement in SQLITE_FTS_DOWNGRADE:
+            op.execute(statement)
@@ -0,0 +1,166 @@
+"""Candidate stats summary
+
+Revision ID: 6e1b94d3a7c2
+Revises: 2f7a6c9d1b83
+Create Date: 2026-10-16 16:22:10.417385
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6e1b94d3a7c2"
+down_revision: Union[str, None] = "2f7a6c9d1b83"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_UPGRADE = [
+    """
+    CREATE TRIGGER IF NOT EXISTS candidate_stats_ai AFTER INSERT ON candidates
+    BEGIN
+        INSERT INTO candidate_stats(user_id, experience, candidates)
+        SELECT new.user_id, new.experience, 0
+        WHERE NOT EXISTS (
+            SELECT 1 FROM candidate_stats
+            WHERE user_id IS new.user_id AND experience IS new.experience
+        );
+        UPDATE candidate_stats SET candidates = candidates + 1
+        WHERE user_id IS new.user_id AND experience IS new.experience;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS candidate_stats_ad AFTER DELETE ON candidates
+    BEGIN
+        UPDATE candidate_stats SET candidates = candidates - 1
+        WHERE user_id IS old.user_id AND experience IS old.experience;
+        DELETE FROM candidate_stats
+        WHERE user_id IS old.user_id AND experience IS old.experience
+        AND candidates <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS candidate_stats_au
+    AFTER UPDATE OF user_id, experience ON candidates
+    WHEN old.user_id IS NOT new.user_id OR old.experience IS NOT new.experience
+    BEGIN
+        UPDATE candidate_stats SET candidates = candidates - 1
+        WHERE user_id IS old.user_id AND experience IS old.experience;
+        DELETE FROM candidate_stats
+        WHERE user_id IS old.user_id AND experience IS old.experience
+        AND candidates <= 0;
+        INSERT INTO candidate_stats(user_id, experience, candidates)
+        SELECT new.user_id, new.experience, 0
+        WHERE NOT EXISTS (
+            SELECT 1 FROM candidate_stats
+            WHERE user_id IS new.user_id AND experience IS new.experience
+        );
+        UPDATE candidate_stats SET candidates = candidates + 1
+        WHERE user_id IS new.user_id AND experience IS new.experience;
+    END
+    """,
+]
+
+POSTGRES_UPGRADE = [
+    """
+    CREATE OR REPLACE FUNCTION apply_candidate_stats() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO candidate_stats(user_id, experience, candidates)
+            SELECT user_id, experience, count(*) FROM new_rows
+            GROUP BY user_id, experience
+            ON CONFLICT (user_id, experience) DO UPDATE
+            SET candidates = candidate_stats.candidates + EXCLUDED.candidates;
+            RETURN NULL;
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO candidate_stats(user_id, experience, candidates)
+            SELECT user_id, experience, -count(*) FROM old_rows
+            GROUP BY user_id, experience
+            ON CONFLICT (user_id, experience) DO UPDATE
+            SET candidates = candidate_stats.candidates + EXCLUDED.candidates;
+        ELSE
+            INSERT INTO candidate_stats(user_id, experience, candidates)
+            SELECT user_id, experience, sum(delta) FROM (
+                SELECT user_id, experience, 1 AS delta FROM new_rows
+                UNION ALL
+                SELECT user_id, experience, -1 AS delta FROM old_rows
+            ) AS changes
+            GROUP BY user_id, experience
+            HAVING sum(delta) <> 0
+            ON CONFLICT (user_id, experience) DO UPDATE
+            SET candidates = candidate_stats.candidates + EXCLUDED.candidates;
+        END IF;
+        IF FOUND THEN
+            DELETE FROM candidate_stats WHERE candidates <= 0;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER candidate_stats_ai AFTER INSERT ON candidates
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_candidate_stats()
+    """,
+    """
+    CREATE TRIGGER candidate_stats_au AFTER UPDATE ON candidates
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_candidate_stats()
+    """,
+    """
+    CREATE TRIGGER candidate_stats_ad AFTER DELETE ON candidates
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_candidate_stats()
+    """,
+]
+
+TRIGGERS = ("candidate_stats_ai", "candidate_stats_au", "candidate_stats_ad")
+
+BACKFILL = """
+    INSERT INTO candidate_stats(user_id, experience, candidates)
+    SELECT user_id, experience, count(*) FROM candidates
+    GROUP BY user_id, experience
+"""
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    op.create_table(
+        "candidate_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("experience", sa.Integer(), nullable=True),
+        sa.Column("candidates", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_candidate_stats_key",
+        "candidate_stats",
+        ["user_id", "experience"],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+    if dialect == "postgresql":
+        # No write may slip in between the backfill and the triggers
+        op.execute("LOCK TABLE candidates IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(BACKFILL)
+    for statement in SQLITE_UPGRADE if dialect == "sqlite" else POSTGRES_UPGRADE:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    postgresql = op.get_bind().dialect.name == "postgresql"
+    for trigger in TRIGGERS:
+        op.execute(
+            f"DROP TRIGGER IF EXISTS {trigger} ON candidates"
+            if postgresql
+            else f"DROP TRIGGER IF EXISTS {trigger}"
+        )
+    if postgresql:
+        op.execute("DROP FUNCTION IF EXISTS apply_candidate_stats()")
+    op.drop_index("ix_candidate_stats_key", table_name="candidate_stats")
+    op.drop_table("candidate_stats")
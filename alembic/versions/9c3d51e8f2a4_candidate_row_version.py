@@ -0,0 +1,30 @@
+"""Candidate row version
+
+Revision ID: 9c3d51e8f2a4
+Revises: 4b9e2f1c7a30
+Create Date: 2026-10-16 11:40:05.217934
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3d51e8f2a4"
+down_revision: Union[str, None] = "4b9e2f1c7a30"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "candidates",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("candidates", "version")
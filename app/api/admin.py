@@ -0,0 +1,73 @@
+import os
+import logging
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.api.user import get_current_user
+import app.models.user as UserModel
+from app.utils.diagnostics import DIAGNOSTICS_ENABLED, diagnostics
+
+
+# Comma separated usernames allowed on the /admin routes, anyone can sign up
+# through POST /user so a logged in user is not enough
+ADMIN_USERNAMES = {
+    username.strip()
+    for username in os.getenv("ADMIN_USERNAMES", "").split(",")
+    if username.strip()
+}
+
+
+async def get_admin_user(current_user: UserModel = Depends(get_current_user)):
+    """Dependency to allow the configured admins only, and nobody while the
+    diagnostics are disabled
+    Args:
+        current_user (User): the logged in user
+    Returns:
+        User: the logged in user
+    """
+    if not DIAGNOSTICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Admin access required.")
+    return current_user
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(get_admin_user)])
+
+
+@router.get("/diagnostics")
+async def fetch_diagnostics(
+    kind: Optional[Literal["slow_query", "n_plus_one"]] = None,
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """Endpoint to list the latest slow query and N+1 findings
+    Args:
+        kind (str | None): only return slow_query or n_plus_one findings
+        limit (int): maximum number of findings, newest first
+    Returns:
+        dict: diagnostics settings and findings with route and query plan
+    """
+    try:
+        return {
+            "enabled": DIAGNOSTICS_ENABLED,
+            "slow_query_ms": diagnostics.slow_query_ms,
+            "n_plus_one_threshold": diagnostics.n_plus_one_threshold,
+            "findings": diagnostics.findings(kind, limit),
+        }
+    except Exception as e:
+        logging.error(f"Something went wrong at fetch_diagnostics: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Something went wrong.",
+        )
+
+
+@router.delete("/diagnostics")
+async def clear_diagnostics():
+    """Endpoint to clear the diagnostics findings
+    Args:
+        None
+    Returns:
+        str: confirmation message
+    """
+    diagnostics.clear()
+    return "Diagnostics findings cleared."
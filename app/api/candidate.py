@@ -1,24 +1,154 @@
+import os
+import time
 import logging
-from typing import Optional
-from sqlalchemy import or_
+from typing import Literal, Optional
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, or_, select, update
 from app.api.user import get_current_user
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 import app.models.candidate as CandidateModel
 import app.models.user as UserModel
-from app.database import get_db
+from app.database import get_db, get_read_db
 import app.schemas.candidate as candidate_schema
+from app.utils.pagination import NEXT, PREV, encode_cursor, decode_cursor
+from app.utils.search import apply_name_search
+from app.utils.bulk import (
+    detect_format,
+    parse_rows,
+    insert_candidates,
+    write_in_chunks,
+)
+from app.utils.cache import make_cache
+from app.utils.etag import (
+    candidate_etag,
+    if_match_versions,
+    list_etag,
+    not_modified,
+)
+from app.utils.count import count_cache_key, count_rows
+from app.utils.stats import candidate_stats
 
 
 router = APIRouter()
 
+# Rows sent per executemany round trip by bulk ingestion
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", 1000))
+
+# Rows written per statement by the batch update and delete endpoints
+BATCH_WRITE_CHUNK_SIZE = int(os.getenv("BATCH_WRITE_CHUNK_SIZE", 1000))
+
+# candidate id -> candidate columns, read through by fetch_candidate and
+# refreshed or invalidated by every write endpoint
+candidate_cache = make_cache(
+    "candidate",
+    maxsize=int(os.getenv("CANDIDATE_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("CANDIDATE_CACHE_TTL", 300)),
+)
+
+
+# Columns handed back by the single statement writes, as the cache stores them
+RETURNED_COLUMNS = (
+    CandidateModel.Candidate.id,
+    CandidateModel.Candidate.user_id,
+    CandidateModel.Candidate.first_name,
+    CandidateModel.Candidate.last_name,
+    CandidateModel.Candidate.experience,
+    CandidateModel.Candidate.version,
+)
+
+
+def to_cache_entry(candidate) -> dict:
+    return {
+        "id": candidate.id,
+        "user_id": candidate.user_id,
+        "first_name": candidate.first_name,
+        "last_name": candidate.last_name,
+        "experience": candidate.experience,
+        "version": candidate.version,
+    }
+
+
+# Columns read for list pages: the CandidateBase fields, plus id and version
+# for cursors and ETags
+LIST_COLUMNS = (
+    CandidateModel.Candidate.id,
+    CandidateModel.Candidate.version,
+    CandidateModel.Candidate.first_name,
+    CandidateModel.Candidate.last_name,
+    CandidateModel.Candidate.experience,
+)
+
+
+def list_payload(rows) -> list:
+    # Projected rows straight to plain dicts, skipping ORM identity map
+    # bookkeeping and a CandidateBase validation per row
+    return [
+        {"first_name": first_name, "last_name": last_name, "experience": experience}
+        for _, _, first_name, last_name, experience in rows
+    ]
+
+
+def filter_candidates(
+    query, search_by_name: Optional[str], search_by_experience: Optional[int], dialect
+):
+    """Apply the /all-candidates search filters to a candidate query
+    Args:
+        query (Select): candidate query to filter
+        search_by_name (str | None): name substring filter
+        search_by_experience (int | None): experience filter
+        dialect (str): name of the database dialect in use
+    Returns:
+        tuple: (filtered query, relevance ordering or None)
+    """
+    if search_by_experience:
+        query = query.filter(
+            or_(CandidateModel.Candidate.experience == search_by_experience)
+        )
+    if search_by_name:
+        return apply_name_search(query, search_by_name, dialect)
+    return query, None
+
+
+def batch_selection(selection: candidate_schema.CandidateSelection, dialect: str):
+    # An empty selection would write the whole table, insist on a filter
+    if (
+        selection.ids is None
+        and not selection.search_by_name
+        and not selection.search_by_experience
+    ):
+        raise HTTPException(
+            status_code=400, detail="Pass ids or a search filter to select candidates"
+        )
+    query, _ = filter_candidates(
+        select(CandidateModel.Candidate.id),
+        selection.search_by_name,
+        selection.search_by_experience,
+        dialect,
+    )
+    return query
+
+
+async def forget_candidates(ids: list):
+    for start in range(0, len(ids), BATCH_WRITE_CHUNK_SIZE):
+        chunk = ids[start : start + BATCH_WRITE_CHUNK_SIZE]
+        await candidate_cache.delete(*map(str, chunk))
+
+
+def precondition_failed():
+    return JSONResponse(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        content={"detail": "Candidate has been modified, fetch it again."},
+    )
+
 
 @router.post(
     "/candidates", response_model=candidate_schema.CandidateCreateResponse | str
 )
-def add_candidate(
+async def add_candidate(
     candidate_data: candidate_schema.CandidateBase,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: UserModel.User = Depends(get_current_user),
 ):
     """Endpoint to add a candidate
@@ -30,17 +160,21 @@ def add_candidate(
         candidate(CandidateCreateResponse | str): newly created candidate id
     """
     try:
-        # Create new candidate profile
-        new_candidate = CandidateModel.Candidate(
-            user_id=current_user.id,
-            first_name=candidate_data.first_name,
-            last_name=candidate_data.last_name,
-            experience=candidate_data.experience,
-        )
-
-        db.add(new_candidate)
-        db.commit()
-        db.refresh(new_candidate)
+        # Create new candidate profile, reading back what the cache needs
+        new_candidate = (
+            await db.execute(
+                insert(CandidateModel.Candidate)
+                .values(
+                    user_id=current_user.id,
+                    first_name=candidate_data.first_name,
+                    last_name=candidate_data.last_name,
+                    experience=candidate_data.experience,
+                )
+                .returning(*RETURNED_COLUMNS)
+            )
+        ).one()
+        await db.commit()
+        await candidate_cache.set(str(new_candidate.id), to_cache_entry(new_candidate))
 
         return candidate_schema.CandidateCreateResponse(id=new_candidate.id)
     except HTTPException as e:
@@ -51,29 +185,131 @@ def add_candidate(
         return "Something went wrong while adding candidate profile"
 
 
+@router.post(
+    "/candidates/bulk", response_model=candidate_schema.CandidateBulkResponse | str
+)
+async def add_candidates_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserModel.User = Depends(get_current_user),
+):
+    """Endpoint to add many candidates from a JSON array, NDJSON or CSV payload,
+    sent as the request body or as a multipart "file" upload
+    Args:
+        request (Request): incoming request carrying the payload
+        Session (database session)
+        current_user (UserModel)
+    Returns:
+        dict (CandidateBulkResponse | str): created ids and per-row errors
+    """
+    try:
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            upload = (await request.form()).get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="No file uploaded.")
+            payload_format = detect_format(upload.content_type, upload.filename)
+            payload = await upload.read()
+        else:
+            payload_format = detect_format(content_type)
+            payload = await request.body()
+
+        started = time.perf_counter()
+        valid_rows, errors = [], []
+        for row_number, row in enumerate(parse_rows(payload, payload_format), 1):
+            try:
+                if not isinstance(row, dict):
+                    raise ValueError("Row is not an object")
+                candidate = candidate_schema.CandidateBase.model_validate(row)
+            except ValidationError as e:
+                errors.append(
+                    {"row": row_number, "errors": e.errors(include_url=False)}
+                )
+                continue
+            except ValueError as e:
+                errors.append({"row": row_number, "errors": [str(e)]})
+                continue
+            valid_rows.append({"user_id": current_user.id, **candidate.model_dump()})
+
+        ids = await insert_candidates(db, valid_rows, BULK_INSERT_BATCH_SIZE)
+        await db.commit()
+
+        elapsed = time.perf_counter() - started
+        logging.info(
+            f"Bulk inserted {len(ids)} candidates in {elapsed:.2f} seconds "
+            f"({len(ids) / elapsed:.0f} rows/sec)"
+        )
+        return candidate_schema.CandidateBulkResponse(
+            created=len(ids), ids=ids, errors=errors
+        )
+    except ValueError as e:
+        logging.error(f"Invalid payload at add_candidates_bulk: {e}")
+        return f"Invalid payload: {e}"
+    except HTTPException as e:
+        logging.error(f"HTTPException occurred at add_candidates_bulk: {e.detail}")
+        return e.detail
+    except Exception as e:
+        logging.error(f"Error occurred at add_candidates_bulk{e}")
+        return "Something went wrong while adding candidate profiles"
+
+
+@router.get(
+    "/candidates/stats", response_model=candidate_schema.CandidateStatsResponse | str
+)
+async def fetch_candidate_stats(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserModel.User = Depends(get_current_user),
+):
+    """Endpoint to fetch aggregate candidate statistics: experience histogram
+    and percentiles, and the number of candidates per owning user
+    Args:
+        Session (database session)
+        current_user (UserModel)
+    Returns:
+        stats (CandidateStatsResponse | str): candidate statistics
+    """
+    try:
+        return await candidate_stats(db)
+    except Exception as e:
+        logging.error(f"Error occurred at fetch_candidate_stats{e}")
+        return "Something went wrong while fetching candidate statistics"
+
+
 @router.get("/candidates/{id}", response_model=candidate_schema.CandidateBase | str)
-def fetch_candidate(
+async def fetch_candidate(
     id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_user: UserModel.User = Depends(get_current_user),
 ):
-    """Endpoint to add a candidate
+    """Endpoint to fetch a candidate, answering 304 when If-None-Match
+    names the current ETag
     Args:
         id (int)
+        request (Request)
+        response (Response)
         Session (database session)
         current_user (UserModel)
     Returns:
         candidate (CandidateBase | str): candidate fetched
     """
     try:
-        candidate = (
-            db.query(CandidateModel.Candidate)
-            .filter(CandidateModel.Candidate.id == id)
-            .first()
-        )
+        cached = await candidate_cache.get(str(id))
+        if cached is not None and "version" in cached:
+            etag = candidate_etag(id, cached["version"])
+            return not_modified(request, response, etag) or cached
+
+        candidate = await db.get(CandidateModel.Candidate, id)
         if not candidate:
             raise HTTPException(status_code=404, detail="Candidate not found")
-        return candidate
+        # A replica row may predate a write whose invalidation already ran,
+        # only primary reads are fresh enough to share
+        if db.sync_session.info.get("replica") is None:
+            # A concurrent PUT may have cached a newer version meanwhile
+            await candidate_cache.set_newer(str(id), to_cache_entry(candidate))
+        etag = candidate_etag(candidate.id, candidate.version)
+        return not_modified(request, response, etag) or candidate
     except HTTPException as e:
         logging.error(f"HTTPException occurred at fetch_candidate: {e.detail}")
         return e.detail
@@ -83,37 +319,60 @@ def fetch_candidate(
 
 
 @router.put("/candidates/{id}", response_model=candidate_schema.CandidateBase | str)
-def update_candidate(
+async def update_candidate(
     id: int,
     candidate_data: candidate_schema.CandidateBase,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    """Endpoint to add a candidate
+    """Endpoint to update a candidate, answering 412 when If-Match does not
+    name the current ETag
     Args:
         id (int)
+        request (Request)
+        response (Response)
         Session (database session)
         current_user (UserModel)
     Returns:
         candidate (CandidateBase | str): candidate fetched with updated details
     """
     try:
-        candidate = (
-            db.query(CandidateModel.Candidate)
-            .filter(CandidateModel.Candidate.id == id)
-            .first()
+        # Update the candidate and bump its version in one statement, the
+        # If-Match precondition becomes part of the WHERE clause
+        candidate = CandidateModel.Candidate
+        statement = (
+            update(candidate)
+            .where(candidate.id == id)
+            .values(
+                first_name=candidate_data.first_name,
+                last_name=candidate_data.last_name,
+                experience=candidate_data.experience,
+                version=candidate.version + 1,
+                updated_at=func.now(),
+            )
+            .returning(*RETURNED_COLUMNS)
         )
-        if not candidate:
-            raise HTTPException(status_code=404, detail="Candidate not found")
+        versions = if_match_versions(request.headers.get("if-match"), id)
+        if versions is not None:
+            statement = statement.where(candidate.version.in_(versions))
+        updated = (await db.execute(statement)).one_or_none()
+        if updated is None:
+            # Only a failed conditional update pays a lookup, to tell a
+            # missing candidate from a stale ETag
+            if versions is None or not await db.scalar(
+                select(candidate.id).where(candidate.id == id)
+            ):
+                raise HTTPException(status_code=404, detail="Candidate not found")
+            return precondition_failed()
+        await db.commit()
 
-        # Update the candidate
-        candidate.first_name = candidate_data.first_name
-        candidate.last_name = candidate_data.last_name
-        candidate.experience = candidate_data.experience
-        db.commit()
-        db.refresh(candidate)
+        entry = to_cache_entry(updated)
+        await candidate_cache.set_newer(str(id), entry)
+        response.headers["ETag"] = candidate_etag(updated.id, updated.version)
 
-        return candidate
+        return entry
     except HTTPException as e:
         logging.error(f"HTTPException occurred at update_candidate: {e.detail}")
         return e.detail
@@ -123,9 +382,9 @@ def update_candidate(
 
 
 @router.delete("/candidates/{id}", response_model=candidate_schema.CandidateBase | str)
-def delete_candidate(
+async def delete_candidate(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: UserModel = Depends(get_current_user),
 ):
     """Endpoint to delete a candidate
@@ -138,17 +397,18 @@ def delete_candidate(
     """
     try:
         candidate = (
-            db.query(CandidateModel.Candidate)
-            .filter(CandidateModel.Candidate.id == id)
-            .first()
-        )
-        if not candidate:
+            await db.execute(
+                delete(CandidateModel.Candidate)
+                .where(CandidateModel.Candidate.id == id)
+                .returning(*RETURNED_COLUMNS)
+            )
+        ).one_or_none()
+        if candidate is None:
             raise HTTPException(status_code=404, detail="Candidate not found")
+        await db.commit()
+        await candidate_cache.delete(str(id))
 
-        db.delete(candidate)
-        db.commit()
-
-        return candidate
+        return to_cache_entry(candidate)
 
     except HTTPException as e:
         logging.error(f"HTTPException occurred at delete_candidate: {e.detail}")
@@ -161,60 +421,182 @@ def delete_candidate(
         )
 
 
+@router.patch(
+    "/candidates", response_model=candidate_schema.CandidateBatchResponse | str
+)
+async def update_candidates_batch(
+    batch: candidate_schema.CandidateBatchUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """Endpoint to apply the same changes to many candidates, picked by ids
+    and/or the /all-candidates search filters, in one transaction
+    Args:
+        batch (CandidateBatchUpdate): selection and fields to set
+        Session (database session)
+        current_user (UserModel)
+    Returns:
+        result (CandidateBatchResponse | str): number and ids of updated rows
+    """
+    try:
+        changes = batch.changes.model_dump(exclude_unset=True)
+        if not changes:
+            raise HTTPException(status_code=400, detail="No fields to update")
+        selection = batch_selection(batch, db.bind.dialect.name)
+        candidate = CandidateModel.Candidate
+        statement = update(candidate).values(
+            **changes, version=candidate.version + 1, updated_at=func.now()
+        )
+        ids = await write_in_chunks(
+            db, statement, selection, BATCH_WRITE_CHUNK_SIZE, batch.ids
+        )
+        await db.commit()
+        await forget_candidates(ids)
+
+        return candidate_schema.CandidateBatchResponse(affected=len(ids), ids=ids)
+    except HTTPException as e:
+        logging.error(f"HTTPException occurred at update_candidates_batch: {e.detail}")
+        return e.detail
+    except Exception as e:
+        logging.error(f"Error occurred at update_candidates_batch{e}")
+        return "Something went wrong while updating candidate profiles"
+
+
+@router.delete(
+    "/candidates", response_model=candidate_schema.CandidateBatchResponse | str
+)
+async def delete_candidates_batch(
+    selection: candidate_schema.CandidateSelection,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """Endpoint to delete many candidates, picked by ids and/or the
+    /all-candidates search filters, in one transaction
+    Args:
+        selection (CandidateSelection): candidates to delete
+        Session (database session)
+        current_user (UserModel)
+    Returns:
+        result (CandidateBatchResponse | str): number and ids of deleted rows
+    """
+    try:
+        query = batch_selection(selection, db.bind.dialect.name)
+        ids = await write_in_chunks(
+            db,
+            delete(CandidateModel.Candidate),
+            query,
+            BATCH_WRITE_CHUNK_SIZE,
+            selection.ids,
+        )
+        await db.commit()
+        await forget_candidates(ids)
+
+        return candidate_schema.CandidateBatchResponse(affected=len(ids), ids=ids)
+    except HTTPException as e:
+        logging.error(f"HTTPException occurred at delete_candidates_batch: {e.detail}")
+        return e.detail
+    except Exception as e:
+        logging.error(f"Error occurred at delete_candidates_batch{e}")
+        return "Something went wrong while deleting candidate profiles"
+
+
 @router.get("/all-candidates", response_model=dict | str)
-def fetch_all_candidates(
-    db: Session = Depends(get_db),
+async def fetch_all_candidates(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_user),
     search_by_name: Optional[str] = None,
     search_by_experience: Optional[int] = None,
     page: int = 1,
     page_size: int = 10,
+    pagination: Literal["offset", "cursor"] = "offset",
+    cursor: Optional[str] = None,
+    count_mode: Literal["exact", "estimated", "cached"] = "exact",
 ):
-    """Endpoint to fetch all candidates
+    """Endpoint to fetch all candidates, answering 304 when If-None-Match
+    names the ETag of the requested page
     Args:
+        request (Request)
+        response (Response)
         Session (database session)
         current_user (UserModel)
-        search_by_name (str): search filter
+        search_by_name (str): search filter, ranked by relevance in offset mode
         search_by_experience (int): search filter
         page (str): pagination number
         page_size (str): pagination size
+        pagination (str): "offset" (default) or "cursor" for keyset pagination
+        cursor (str): opaque next_cursor/prev_cursor from a previous cursor page
+        count_mode (str): how total_candidates is computed, "exact" COUNT(*),
+            "estimated" from planner statistics or "cached" for a few seconds
     Returns:
-        dict: Dictionary with searched candidates and pagination info
+        ORJSONResponse: searched candidates and pagination info
     """
     try:
-        search_filter = []
-        if search_by_name:
-            search_filter.append(
-                or_(
-                    CandidateModel.Candidate.first_name.ilike(f"%{search_by_name}%"),
-                    CandidateModel.Candidate.last_name.ilike(f"%{search_by_name}%"),
-                )
-            )
-        if search_by_experience:
-            search_filter.append(
-                or_(CandidateModel.Candidate.experience == search_by_experience)
+        query, relevance = filter_candidates(
+            select(*LIST_COLUMNS),
+            search_by_name,
+            search_by_experience,
+            db.bind.dialect.name,
+        )
+
+        if pagination == "cursor" or cursor:
+            return await fetch_candidates_page_by_cursor(
+                db, query, cursor, page_size, request, response
             )
-        query = db.query(CandidateModel.Candidate).filter(*search_filter)
-        total_candidates = query.count()
+
+        total_candidates = await count_rows(
+            db,
+            query,
+            count_mode,
+            table=CandidateModel.Candidate.__tablename__,
+            filtered=bool(search_by_experience or search_by_name),
+            cache_key=count_cache_key(
+                name=search_by_name, experience=search_by_experience
+            ),
+        )
+        if relevance is not None:
+            query = query.order_by(relevance, CandidateModel.Candidate.id)
 
         # Apply pagination according to page info given
-        candidates = query.offset((page - 1) * page_size).limit(page_size).all()
+        candidates = (
+            await db.execute(query.offset((page - 1) * page_size).limit(page_size))
+        ).all()
 
+        # Estimates and cached totals may lag, never report fewer rows than
+        # the pages up to this one hold
+        total_candidates = max(
+            total_candidates, (page - 1) * page_size + len(candidates)
+        )
         total_pages = (total_candidates + page_size - 1) // page_size
 
         if not candidates:
             raise HTTPException(status_code=404, detail="No candidates found.")
 
-        return {
-            "total_candidates": total_candidates,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": total_pages,
-            "candidates": [
-                candidate_schema.CandidateBase.from_orm(candidate)
-                for candidate in candidates
-            ],
-        }
+        etag = list_etag(
+            total_candidates,
+            count_mode,
+            page,
+            page_size,
+            [(candidate.id, candidate.version) for candidate in candidates],
+        )
+        unchanged = not_modified(request, response, etag)
+        if unchanged:
+            return unchanged
+
+        # Already plain JSON types, send it through orjson without another
+        # validation and encoding pass against the response model
+        return ORJSONResponse(
+            {
+                "total_candidates": total_candidates,
+                "count_mode": count_mode,
+                "page": page,
+                "page_size": page_size,
+                "total_pages": total_pages,
+                "candidates": list_payload(candidates),
+            },
+            headers={"ETag": etag},
+        )
 
     except HTTPException as e:
         logging.error(f"HTTPException occurred at fetch_all_candidates: {e.detail}")
@@ -223,3 +605,73 @@ def fetch_all_candidates(
     except Exception as e:
         logging.error(f"Error occurred at fetch_all_candidates: {e}")
         return "Something went wrong while fetching all candidates profile"
+
+
+async def fetch_candidates_page_by_cursor(
+    db: AsyncSession,
+    query,
+    cursor: Optional[str],
+    page_size: int,
+    request: Request,
+    response: Response,
+):
+    """Keyset pagination over candidate ids, no count and no offset scan
+    Args:
+        Session (database session)
+        query (Select): filtered candidate query
+        cursor (str | None): cursor of the page boundary, None for first page
+        page_size (int): pagination size
+        request (Request)
+        response (Response)
+    Returns:
+        ORJSONResponse: candidates and next/prev cursors
+    """
+    try:
+        key, direction = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    candidate_id = CandidateModel.Candidate.id
+    if direction == PREV:
+        candidates = (
+            await db.execute(
+                query.filter(candidate_id < key)
+                .order_by(candidate_id.desc())
+                .limit(page_size + 1)
+            )
+        ).all()
+        has_prev = len(candidates) > page_size
+        candidates = list(reversed(candidates[:page_size]))
+        has_next = True
+    else:
+        if key is not None:
+            query = query.filter(candidate_id > key)
+        candidates = (
+            await db.execute(query.order_by(candidate_id.asc()).limit(page_size + 1))
+        ).all()
+        has_next = len(candidates) > page_size
+        candidates = candidates[:page_size]
+        has_prev = key is not None
+
+    if not candidates:
+        raise HTTPException(status_code=404, detail="No candidates found.")
+
+    etag = list_etag(
+        has_prev,
+        has_next,
+        page_size,
+        [(candidate.id, candidate.version) for candidate in candidates],
+    )
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
+    return ORJSONResponse(
+        {
+            "page_size": page_size,
+            "next_cursor": encode_cursor(candidates[-1].id, NEXT) if has_next else None,
+            "prev_cursor": encode_cursor(candidates[0].id, PREV) if has_prev else None,
+            "candidates": list_payload(candidates),
+        },
+        headers={"ETag": etag},
+    )
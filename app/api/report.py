@@ -1,82 +1,348 @@
 import os
-import csv
-from io import StringIO
+import json
+import time
+import uuid
 import logging
-from dotenv import load_dotenv
-from celery import Celery
-from celery.result import AsyncResult
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Literal, Optional
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select
 import app.models.candidate as CandidateModel
-from app.database import SessionLocal
+from app.utils.cache import make_cache
+from app.utils.files import RangeFileResponse
+from app.utils.progress import FINAL_STATES, ProgressHub
+from app.utils.report import (
+    REPORT_FORMATS,
+    convert_report,
+    file_sha256,
+    format_available,
+)
+from app.utils.report_store import ReportStore
 
-load_dotenv()
 router = APIRouter()
-celery = Celery(
-    "tasks",
-    broker=os.getenv("CELERY_BROKER_URL"),
-    backend=os.getenv("CELERY_RESULT_BACKEND"),
+
+# Every artifact, in each format, lives in the store under its data version
+REPORT_KIND = "candidates"
+report_store = ReportStore(
+    os.getenv("REPORT_STORE_DIR", "/tmp/candidate_reports"),
+    budget_bytes=int(os.getenv("REPORT_STORE_BUDGET_MB", 1024)) * 1024 * 1024,
 )
+# Rows fetched per round trip from the server side cursor
+REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", 1000))
+# Changes are re-read this many seconds before the last watermark, so rows
+# committed late by a slow transaction are not missed
+REPORT_CHANGE_OVERLAP = float(os.getenv("REPORT_CHANGE_OVERLAP", 60))
+# Parallel subtasks of a full build, they need a result backend that
+# supports chords and a REPORT_STORE_DIR shared by the workers
+REPORT_SHARDS = int(os.getenv("REPORT_SHARDS", 1))
+# Rows between two PROGRESS updates sent to the result backend
+REPORT_PROGRESS_EVERY = int(os.getenv("REPORT_PROGRESS_EVERY", 10000))
+# Result backend polling interval of the progress stream, in seconds
+REPORT_PROGRESS_INTERVAL = float(os.getenv("REPORT_PROGRESS_INTERVAL", 1))
+
+# format -> id and start time of the report task building it, so identical
+# requests made while it runs join it instead of scanning the table again
+inflight_reports = make_cache(
+    "report_inflight",
+    maxsize=len(REPORT_FORMATS),
+    ttl=float(os.getenv("REPORT_INFLIGHT_TTL", 3600)),
+)
+# Seconds a registered task may stay PENDING before it counts as lost, Celery
+# never tells a queued task from one whose message or worker is gone
+REPORT_PENDING_GRACE = float(os.getenv("REPORT_PENDING_GRACE", 60))
+
+
+def report_query():
+    return select(
+        CandidateModel.Candidate.id,
+        CandidateModel.Candidate.first_name,
+        CandidateModel.Candidate.last_name,
+        CandidateModel.Candidate.experience,
+    ).order_by(CandidateModel.Candidate.id)
+
+
+def stream(result):
+    # Rows of a yield_per result, one server side cursor chunk at a time
+    return chain.from_iterable(result.partitions())
+
+
+def track_progress(task, phase: str, rows, task_id: Optional[str] = None):
+    """Pass rows through, publishing a PROGRESS state every
+    REPORT_PROGRESS_EVERY rows
+    Args:
+        task (Task): bound celery task
+        phase (str): step of the build, shown to the client
+        rows (Iterable): rows being written
+        task_id (str | None): task to report for, the running one by default
+    Returns:
+        Iterator: the same rows
+    """
+    task_id = task_id or task.request.id
+    if task_id is None:
+        # Called directly rather than as a task, nobody to report to
+        yield from rows
+        return
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % REPORT_PROGRESS_EVERY == 0:
+            task.update_state(
+                task_id=task_id, state="PROGRESS", meta={"phase": phase, "rows": count}
+            )
+
+
+def discard(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
 
+def publish_report(
+    db,
+    partial_path: str,
+    row_count: int,
+    state: Optional[dict],
+    watermark: datetime,
+    started: float,
+    report_format: str = "csv",
+) -> str:
+    """Store a freshly written CSV report, record its state and derive the
+    requested format from it
+    Args:
+        db (Session): database session
+        partial_path (str): fully written report, in a store temporary file
+        row_count (int): rows in the report
+        state (dict | None): state of the previous report, None for full builds
+        watermark (datetime): DB time taken before the rows were read
+        started (float): wall clock start of the run
+        report_format (str): format to return the report in
+    Returns:
+        str: artifact path, or a message when there are no candidates
+    """
+    if not row_count:
+        discard(partial_path)
+        report_store.remove_state(REPORT_KIND)
+        return "No candidate profiles found."
 
-@celery.task
-def generate_report_task():
+    # Unchanged content maps to the artifact that is already stored
+    sha256 = file_sha256(partial_path)
+    report_store.put(partial_path, REPORT_KIND, sha256, "csv")
+    report_store.save_state(
+        REPORT_KIND, {"sha256": sha256, "rows": row_count, "watermark": watermark}
+    )
+
+    # Tombstones older than the overlap window have been applied
+    db.execute(
+        delete(CandidateModel.CandidateDeletion).where(
+            CandidateModel.CandidateDeletion.deleted_at
+            < watermark - timedelta(seconds=REPORT_CHANGE_OVERLAP)
+        )
+    )
+    db.commit()
+
+    elapsed = time.time() - started
+    mode = "full" if state is None else "incremental"
+    throughput = f" ({row_count / elapsed:.0f} rows/sec)" if elapsed > 0 else ""
+    logging.info(
+        f"Generating report task completed ({mode}): {row_count} rows "
+        f"in {elapsed:.2f} seconds{throughput}, sha256 {sha256}"
+    )
+    return export_report(sha256, report_format)
+
+
+def export_report(version: str, report_format: str) -> str:
+    """Return the report of a data version in a format, deriving it from
+    the CSV artifact unless the store already has it
+    Args:
+        version (str): data version, the SHA-256 of the CSV report
+        report_format (str): one of REPORT_FORMATS
+    Returns:
+        str: artifact path
+    """
+    path = report_store.get(REPORT_KIND, version, report_format)
+    if path is not None:
+        return path
+
+    started = time.perf_counter()
+    csv_path = report_store.path(REPORT_KIND, version, "csv")
+    partial_path = report_store.temp_path()
+    try:
+        convert_report(csv_path, partial_path, report_format)
+        path = report_store.put(
+            partial_path, REPORT_KIND, version, report_format, keep=[csv_path]
+        )
+    finally:
+        discard(partial_path)
+    logging.info(
+        f"Exported report as {report_format} in "
+        f"{time.perf_counter() - started:.2f} seconds"
+    )
+    return path
+
+
+def task_result(task_id: str):
     """
-    Function to generate report as a celery task
+    Function to return the AsyncResult of a task, the Celery app in
+    app.worker is only imported once a report is asked for
     """
-    with SessionLocal() as db:
+    from app.worker import celery
 
-        try:
-            logging.info("Generating report task started")
-            candidates = db.query(CandidateModel.Candidate).all()
-            if not candidates:
-                return "No candidate profiles found."
-
-            # Generate CSV content
-            buffer = StringIO()
-            writer = csv.writer(buffer)
-            writer.writerow(["ID", "First Name", "Last Name", "Experience"])
-
-            for candidate in candidates:
-                writer.writerow(
-                    [
-                        candidate.id,
-                        candidate.first_name,
-                        candidate.last_name,
-                        candidate.experience,
-                    ]
-                )
-
-            # Save buffer content to a file
-            report_path = "/tmp/candidates_report.csv"
-            with open(report_path, "w") as file:
-                file.write(buffer.getvalue())
-
-            logging.info("Generating report task completed")
-            return report_path
-
-        finally:
-            db.close()
+    return celery.AsyncResult(task_id)
+
+
+def has_result_backend() -> bool:
+    """
+    Function to tell whether task states can be read back, without
+    CELERY_RESULT_BACKEND Celery uses a DisabledBackend that cannot
+    """
+    from celery.backends.base import DisabledBackend
+    from app.worker import celery
+
+    return not isinstance(celery.backend, DisabledBackend)
+
+
+def task_finished(task_id: str, started: float) -> bool:
+    """Whether a registered report task is done, or lost
+    Args:
+        task_id (str)
+        started (float): wall clock time it was queued at
+    Returns:
+        bool: True once it finished, or when it is still PENDING after
+            REPORT_PENDING_GRACE seconds, workers mark builds STARTED
+    """
+    state = task_result(task_id).state
+    if state == "PENDING":
+        return time.time() - started > REPORT_PENDING_GRACE
+    return state in FINAL_STATES
+
+
+def shard_progress(shard_ids: list) -> dict:
+    """Rows written so far by the shards of a parallel report build
+    Args:
+        shard_ids (list): task ids of the shards, in id range order
+    Returns:
+        dict: phase, total rows and the rows of each shard
+    """
+    shards = []
+    for shard_id in shard_ids:
+        result = task_result(shard_id)
+        state = result.state
+        if state == "PROGRESS":
+            shards.append(result.info["rows"])
+        elif state == "SUCCESS":
+            shards.append(result.result["rows"])
+        else:
+            shards.append(0)
+    return {"phase": "shards", "rows": sum(shards), "shards": shards}
+
+
+def task_progress(task_id: str) -> dict:
+    """
+    Function to return the state of a report task as a progress event
+    """
+    result = task_result(task_id)
+    state = result.state
+    if state == "PROGRESS":
+        if "shards" in result.info:
+            return {"state": state, **shard_progress(result.info["shards"])}
+        return {"state": state, **result.info}
+    if state == "SUCCESS":
+        return {"state": state, "download_url": f"/download-report/{task_id}"}
+    if state in FINAL_STATES:
+        return {"state": state, "error": str(result.info)}
+    return {"state": state}
+
+
+progress_hub = ProgressHub(task_progress, interval=REPORT_PROGRESS_INTERVAL)
 
 
 @router.get("/generate-report")
-def generate_report():
+async def generate_report(
+    format: Literal["csv", "gzip", "zstd", "ndjson", "parquet", "arrow"] = "csv"
+):
     """
-    Endpoint to generate report
+    Endpoint to generate report, joining the task already building the same
+    report when there is one
     Args:
-        None
+        format (str): csv, gzip or zstd compressed csv, ndjson, parquet or arrow
     Returns:
         dict: Dictionary with task id and a message
     """
     # Trigger the Celery task
     try:
-        task = generate_report_task.delay()
-        return {"task_id": task.id, "message": "Report generation started."}
+        from app.worker import generate_report_task
+
+        if not format_available(format):
+            raise HTTPException(
+                status_code=400,
+                detail=f"The {format} format needs the "
+                f"{REPORT_FORMATS[format].module} package.",
+            )
+        task_id = str(uuid.uuid4())
+        # Without a result backend nobody can tell when a build is done, so
+        # identical requests are not joined, each one starts its own
+        coalesce = has_result_backend()
+        entry = {"task_id": task_id, "started": time.time()}
+        running = await inflight_reports.add(format, entry) if coalesce else None
+        if running is not None:
+            if not await run_in_threadpool(
+                task_finished, running["task_id"], running["started"]
+            ):
+                return {
+                    "task_id": running["task_id"],
+                    "message": "Report generation already in progress.",
+                }
+            # The registered task is done or lost, this request starts the next
+            await inflight_reports.set(format, entry)
+        try:
+            await run_in_threadpool(
+                generate_report_task.apply_async, args=[format], task_id=task_id
+            )
+        except Exception:
+            if coalesce:
+                await inflight_reports.delete(format)
+            raise
+        return {"task_id": task_id, "message": "Report generation started."}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(f"Error occurred at generate_report{e}")
         return "Something went wrong while generating report"
 
 
+@router.get("/report-progress/{task_id}")
+async def report_progress(task_id: str):
+    """
+    Endpoint to stream the progress of a report task as Server-Sent Events
+    Args:
+        task_id (str)
+    Returns:
+        StreamingResponse: "progress" events with the rows written so far,
+            then one "done" event with the download url or a "failed" event
+    """
+
+    async def events():
+        async for event in progress_hub.subscribe(task_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            name = {"SUCCESS": "done", "FAILURE": "failed", "REVOKED": "failed"}.get(
+                event["state"], "progress"
+            )
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/download-report/{task_id}")
 def download_report(task_id: str):
     """
@@ -87,14 +353,28 @@ def download_report(task_id: str):
         FileResponse: FileResponse of generated report
     """
     try:
-        task_result = AsyncResult(task_id, app=celery)
-        if task_result.status != "SUCCESS":
+        result = task_result(task_id)
+        if result.status != "SUCCESS":
             raise HTTPException(status_code=404, detail="Report is not yet ready.")
 
-        report_path = task_result.result
-        return FileResponse(
-            path=report_path, filename="candidates_report.csv", media_type="text/csv"
+        report_path = result.result
+        if not os.path.isfile(report_path):
+            # No candidates at the time, or evicted to keep the store in budget
+            raise HTTPException(
+                status_code=404, detail="Report is not available, generate it again."
+            )
+        kind, version, report_format = report_store.describe(report_path)
+        # Served artifacts count as recently used for eviction
+        report_store.get(kind, version, report_format)
+        extension = REPORT_FORMATS[report_format].extension
+        return RangeFileResponse(
+            path=report_path,
+            filename=f"candidates_report{extension}",
+            media_type=REPORT_FORMATS[report_format].media_type,
+            headers={"ETag": f'"{version}-{report_format}"'},
         )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(f"Error occurred at download_report{e}")
         return "Something went wrong while downloading report"
@@ -1,48 +1,63 @@
+import os
 import jwt
 import logging
 from app.utils.helper import (
     SECRET_KEY,
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
 )
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.constants import ALGORITHM
 import app.models.user as UserModel
-from app.database import get_db
+from app.database import get_db, get_read_db
 import app.schemas.user as UserSchema
+from app.utils.cache import make_cache
 
 
 router = APIRouter()
 
+# INSERT constructs that support ON CONFLICT, per dialect
+DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# username -> resolved principal, saves the users lookup on every request
+principal_cache = make_cache(
+    "principal",
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", 60)),
+)
+
 
 @router.post("/user", response_model=UserSchema.UserCreateResponse | str)
-def register_user(user_data: UserSchema.UserCreate, db: Session = Depends(get_db)):
+async def register_user(
+    user_data: UserSchema.UserCreate, db: AsyncSession = Depends(get_db)
+):
     try:
-        # Check if username already exists
-        existing_user = (
-            db.query(UserModel.User)
-            .filter(UserModel.User.username == user_data.username)
-            .first()
+        # Hash the password before saving
+        # bcrypt is CPU bound, keep it off the event loop
+        hashed_password = await hash_password_async(user_data.password)
+
+        # Add new user to the database, a taken username inserts nothing
+        insert = DIALECT_INSERTS[db.bind.dialect.name]
+        username = await db.scalar(
+            insert(UserModel.User)
+            .values(username=user_data.username, password=hashed_password)
+            .on_conflict_do_nothing(index_elements=[UserModel.User.username])
+            .returning(UserModel.User.username)
         )
-        if existing_user:
+        if username is None:
             raise HTTPException(
                 status_code=400,
                 detail="Username already exists. Please enter a different username",
             )
+        await db.commit()
+        await principal_cache.delete(username)
 
-        # Hash the password before saving
-        hashed_password = hash_password(user_data.password)
-        new_user = UserModel.User(username=user_data.username, password=hashed_password)
-
-        # Add new user to the database
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-
-        return new_user
+        return UserSchema.UserCreateResponse(username=username)
     except HTTPException as e:
         logging.error(f"HTTPException occurred at register_user: {e.detail}")
         raise e  # Re-raise the HTTPException with the correct status code and detail
@@ -55,16 +70,19 @@ def register_user(user_data: UserSchema.UserCreate, db: Session = Depends(get_db
 
 
 @router.post("/login", response_model=UserSchema.UserToken | str)
-def login(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def login(
+    db: AsyncSession = Depends(get_read_db),
+    form_data: OAuth2PasswordRequestForm = Depends(),
 ):
     try:
-        user = (
-            db.query(UserModel.User)
-            .filter(UserModel.User.username == form_data.username)
-            .first()
+        user = await db.scalar(
+            select(UserModel.User).filter(UserModel.User.username == form_data.username)
         )
-        if not user or not verify_password(form_data.password, user.password):
+        # Hand the connection back to the pool while bcrypt runs
+        await db.close()
+        if not user or not await verify_password_async(
+            form_data.password, user.password
+        ):
             raise HTTPException(status_code=400, detail="Invalid credentials")
 
         # Create and return the access token
@@ -85,8 +103,8 @@ def login(
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)
 ):
     try:
         payload = jwt.decode(
@@ -95,11 +113,17 @@ def get_current_user(
         username: str = payload.get("username")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = (
-            db.query(UserModel.User).filter(UserModel.User.username == username).first()
+
+        principal = await principal_cache.get(username)
+        if principal is not None:
+            return UserModel.User(**principal)
+
+        user = await db.scalar(
+            select(UserModel.User).filter(UserModel.User.username == username)
         )
         if user is None:
             raise HTTPException(status_code=401, detail="Invalid user")
+        await principal_cache.set(username, {"id": user.id, "username": user.username})
         return user
 
     except Exception as e:
@@ -107,5 +131,5 @@ def get_current_user(
 
 
 @router.get("/me", response_model=UserSchema.UserCreateResponse)
-def get_me(current_user: UserModel = Depends(get_current_user)):
+async def get_me(current_user: UserModel = Depends(get_current_user)):
     return current_user
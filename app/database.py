@@ -1,25 +1,193 @@
 import os
-from dotenv import load_dotenv
+import threading
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from fastapi import Depends, Request
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from app.utils.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from app.utils.metrics import instrument_engine
+from app.utils.diagnostics import DIAGNOSTICS_ENABLED, diagnostics
+from app.utils.replicas import STICKY_COOKIE, Replica, ReplicaSet, RoutingSession
+
+# Async DBAPI driver used by the API for each backend
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def to_async_url(url: str) -> str:
+    """Swap the driver of a database url for its async counterpart
+    Args:
+        url (str): sync database url, e.g. postgresql+psycopg2://...
+    Returns:
+        str: database url using the async driver of the same backend
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver:
+        url = url.set(drivername=f"{backend}+{driver}")
+    return url.render_as_string(hide_password=False)
+
+
+def pool_options(url: str, poolclass) -> dict:
+    """Connection pool keyword arguments for create_engine, read from env
+    Args:
+        url (str): database url the engine is built for
+        poolclass (Pool): instrumented queue pool class to use
+    Returns:
+        dict: pool keyword arguments, empty for in-memory SQLite
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite must keep its single static connection
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", -1)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "false").lower() == "true",
+    }
 
-load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Optional read replicas, comma separated urls of the same backend
+REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# Empty until connect() adds the replicas of REPLICA_URLS
+replicas = ReplicaSet(
+    [],
+    # Keep below REPORT_CHANGE_OVERLAP, incremental reports read replicas
+    max_lag=float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5)),
+    check_interval=float(os.getenv("REPLICA_CHECK_INTERVAL", 5)),
+)
+# How long a client reads from the primary after writing to it
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 10))
 
 Base = declarative_base()
 
+# Lazily created engines and session factories, importing the app must not
+# load the database drivers
+LAZY_NAMES = ("engine", "async_engine", "SessionLocal", "AsyncSessionLocal")
+_engines = None
+_engines_lock = threading.Lock()
+
+
+def connect() -> dict:
+    """Create the engines and session factories on first call
+    Returns:
+        dict: engine, async_engine, SessionLocal and AsyncSessionLocal
+    """
+    global _engines
+    if _engines is not None:
+        return _engines
+    with _engines_lock:
+        if _engines is not None:
+            return _engines
+        # Sync engine, used by Celery tasks and Alembic
+        engine = create_engine(
+            DATABASE_URL, **pool_options(DATABASE_URL, InstrumentedQueuePool)
+        )
+        # Async engine, used by the API request handlers
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            **pool_options(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool),
+        )
+        replicas.replicas.extend(
+            Replica(
+                url,
+                create_engine(url, **pool_options(url, InstrumentedQueuePool)),
+                create_async_engine(
+                    to_async_url(url),
+                    **pool_options(to_async_url(url), InstrumentedAsyncQueuePool),
+                ),
+            )
+            for url in REPLICA_URLS
+        )
+        for sync_engine in [
+            engine,
+            async_engine.sync_engine,
+            *(replica.engine for replica in replicas.replicas),
+            *(replica.async_engine.sync_engine for replica in replicas.replicas),
+        ]:
+            instrument_engine(sync_engine)
+            if DIAGNOSTICS_ENABLED:
+                diagnostics.install(sync_engine)
+        _engines = {
+            "engine": engine,
+            "async_engine": async_engine,
+            "SessionLocal": sessionmaker(
+                autocommit=False, autoflush=False, bind=engine, class_=RoutingSession
+            ),
+            "AsyncSessionLocal": async_sessionmaker(
+                autoflush=False,
+                expire_on_commit=False,
+                bind=async_engine,
+                sync_session_class=RoutingSession,
+            ),
+        }
+    return _engines
+
+
+def __getattr__(name: str):
+    # from app.database import engine, SessionLocal, ... connects on demand
+    if name in LAZY_NAMES:
+        return connect()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def get_db():
+
+async def get_db():
     """
-    Generator function to return database session object
+    Generator function to return async database session object
     """
-    db = SessionLocal()
-    try:
+    async with connect()["AsyncSessionLocal"]() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """Dependency for read only routes: the request session, reading from a
+    healthy replica unless the client wrote recently or there is none
+    Args:
+        request (Request)
+        Session (database session)
+    Returns:
+        AsyncSession: the session get_db provides for this request
+    """
+    if replicas and not request.cookies.get(STICKY_COOKIE):
+        replica = await replicas.pick_async()
+        if replica is not None:
+            db.sync_session.info["replica"] = replica.async_engine.sync_engine
+    return db
+
+
+def read_session() -> Session:
+    """
+    Function to return a sync session reading from a healthy replica, for
+    Celery tasks, writes through it still go to the primary
+    """
+    db = connect()["SessionLocal"]()
+    replica = replicas.pick()
+    if replica is not None:
+        db.info["replica"] = replica.engine
+    return db
+
+
+def get_pool_stats() -> dict:
+    """
+    Function to return live connection pool stats of the API engine
+    """
+    pool = connect()["async_engine"].pool
+    if not hasattr(pool, "status_dict"):
+        return {"status": pool.status()}
+    return pool.status_dict()
@@ -1,10 +1,18 @@
 import time
-import uvicorn
-from app.api import user, candidate, report
+from app.api import user, candidate, report, admin
+from app.database import REPLICA_STICKY_SECONDS, get_pool_stats, replicas
+from app.utils.cache import cache_stats
+from app.utils.metrics import MetricsMiddleware, gauge_lines, render_metrics
+from app.utils.replicas import ReadYourWritesMiddleware
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import PlainTextResponse
 
 
 app = FastAPI()
+app.add_middleware(
+    ReadYourWritesMiddleware, replicas=replicas, sticky_seconds=REPLICA_STICKY_SECONDS
+)
+app.add_middleware(MetricsMiddleware)
 start_time = time.time()
 
 
@@ -14,19 +22,66 @@ def check_health():
     Args:
         None
     Returns:
-        dict: Dictionary with api status,uptime in seconds and message description
+        dict: Dictionary with api status,uptime in seconds, message description
+            database connection pool, replica, cache and report store stats
     """
     uptime = round(time.time() - start_time, 2)
     return {
         "status": "ok",
         "uptime": f"{uptime} seconds",
         "message": "API is running healthy",
+        "database_pool": get_pool_stats(),
+        "replicas": replicas.stats(),
+        "caches": cache_stats(),
+        "report_store": report.report_store.stats(),
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Endpoint to expose metrics in Prometheus text format
+    Args:
+        None
+    Returns:
+        PlainTextResponse: per route latency/DB histograms, pool and cache stats
+    """
+    pool = get_pool_stats()
+    caches = cache_stats()
+    extra_lines = [
+        *gauge_lines(
+            "db_pool_stat",
+            "API engine connection pool stats",
+            {(stat,): value for stat, value in pool.items()},
+            ("stat",),
+        ),
+        *gauge_lines(
+            "cache_stat",
+            "Cache hit, miss and eviction stats",
+            {
+                (name, stat): value
+                for name, stats in caches.items()
+                for stat, value in stats.items()
+            },
+            ("cache", "stat"),
+        ),
+        *gauge_lines(
+            "report_store_stat",
+            "Report artifact store size and reuse stats",
+            {(stat,): value for stat, value in report.report_store.stats().items()},
+            ("stat",),
+        ),
+    ]
+    return PlainTextResponse(
+        render_metrics(extra_lines), media_type="text/plain; version=0.0.4"
+    )
+
+
 app.include_router(user.router)
 app.include_router(candidate.router)
 app.include_router(report.router)
+app.include_router(admin.router)
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,5 +1,15 @@
 from app.database import Base
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import (
+    DDL,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    ForeignKey,
+    event,
+    func,
+)
 
 
 class Candidate(Base):
@@ -10,3 +20,287 @@ class Candidate(Base):
     first_name = Column(String, index=True)
     last_name = Column(String, index=True)
     experience = Column(Integer)
+    # Row version, bumped by every ORM update, backs ETags and If-Match
+    version = Column(Integer, nullable=False, server_default="1")
+    # Last insert or update, lets the report pick up only what changed
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        index=True,
+        default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (
+        # Trigram indexes serve the substring name search on Postgres
+        Index(
+            "ix_candidates_first_name_trgm",
+            "first_name",
+            postgresql_using="gin",
+            postgresql_ops={"first_name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_candidates_last_name_trgm",
+            "last_name",
+            postgresql_using="gin",
+            postgresql_ops={"last_name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+class CandidateDeletion(Base):
+    """
+    Tombstone of a deleted candidate, written by a trigger on candidates
+    """
+
+    __tablename__ = "candidate_deletions"
+
+    id = Column(Integer, primary_key=True)
+    candidate_id = Column(Integer, nullable=False)
+    deleted_at = Column(
+        DateTime(timezone=True), nullable=False, index=True, server_default=func.now()
+    )
+
+
+class CandidateStat(Base):
+    """
+    Number of candidates per (user_id, experience), kept current by triggers
+    on candidates and rebuilt by the scheduled refresh
+    """
+
+    __tablename__ = "candidate_stats"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer)
+    experience = Column(Integer)
+    candidates = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # NULL keys must collide too, so the Postgres triggers can upsert
+        Index(
+            "ix_candidate_stats_key",
+            "user_id",
+            "experience",
+            unique=True,
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+
+# Record every candidate delete, whichever code path issues it
+SQLITE_DELETION_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS candidates_deletions_ad AFTER DELETE ON candidates
+    BEGIN
+        INSERT INTO candidate_deletions(candidate_id, deleted_at)
+        VALUES (old.id, CURRENT_TIMESTAMP);
+    END
+    """,
+]
+POSTGRES_DELETION_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION record_candidate_deletion() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO candidate_deletions(candidate_id, deleted_at)
+        VALUES (OLD.id, now());
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER candidates_deletions_ad AFTER DELETE ON candidates
+    FOR EACH ROW EXECUTE FUNCTION record_candidate_deletion()
+    """,
+]
+
+
+# Apply each insert, update and delete of candidates to candidate_stats. SQLite
+# works row by row with null safe IS matching, Postgres once per statement
+# from the transition tables so bulk writes touch each summary row once
+SQLITE_STATS_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS candidate_stats_ai AFTER INSERT ON candidates
+    BEGIN
+        INSERT INTO candidate_stats(user_id, experience, candidates)
+        SELECT new.user_id, new.experience, 0
+        WHERE NOT EXISTS (
+            SELECT 1 FROM candidate_stats
+            WHERE user_id IS new.user_id AND experience IS new.experience
+        );
+        UPDATE candidate_stats SET candidates = candidates + 1
+        WHERE user_id IS new.user_id AND experience IS new.experience;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS candidate_stats_ad AFTER DELETE ON candidates
+    BEGIN
+        UPDATE candidate_stats SET candidates = candidates - 1
+        WHERE user_id IS old.user_id AND experience IS old.experience;
+        DELETE FROM candidate_stats
+        WHERE user_id IS old.user_id AND experience IS old.experience
+        AND candidates <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS candidate_stats_au
+    AFTER UPDATE OF user_id, experience ON candidates
+    WHEN old.user_id IS NOT new.user_id OR old.experience IS NOT new.experience
+    BEGIN
+        UPDATE candidate_stats SET candidates = candidates - 1
+        WHERE user_id IS old.user_id AND experience IS old.experience;
+        DELETE FROM candidate_stats
+        WHERE user_id IS old.user_id AND experience IS old.experience
+        AND candidates <= 0;
+        INSERT INTO candidate_stats(user_id, experience, candidates)
+        SELECT new.user_id, new.experience, 0
+        WHERE NOT EXISTS (
+            SELECT 1 FROM candidate_stats
+            WHERE user_id IS new.user_id AND experience IS new.experience
+        );
+        UPDATE candidate_stats SET candidates = candidates + 1
+        WHERE user_id IS new.user_id AND experience IS new.experience;
+    END
+    """,
+]
+POSTGRES_STATS_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION apply_candidate_stats() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO candidate_stats(user_id, experience, candidates)
+            SELECT user_id, experience, count(*) FROM new_rows
+            GROUP BY user_id, experience
+            ON CONFLICT (user_id, experience) DO UPDATE
+            SET candidates = candidate_stats.candidates + EXCLUDED.candidates;
+            RETURN NULL;
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO candidate_stats(user_id, experience, candidates)
+            SELECT user_id, experience, -count(*) FROM old_rows
+            GROUP BY user_id, experience
+            ON CONFLICT (user_id, experience) DO UPDATE
+            SET candidates = candidate_stats.candidates + EXCLUDED.candidates;
+        ELSE
+            INSERT INTO candidate_stats(user_id, experience, candidates)
+            SELECT user_id, experience, sum(delta) FROM (
+                SELECT user_id, experience, 1 AS delta FROM new_rows
+                UNION ALL
+                SELECT user_id, experience, -1 AS delta FROM old_rows
+            ) AS changes
+            GROUP BY user_id, experience
+            HAVING sum(delta) <> 0
+            ON CONFLICT (user_id, experience) DO UPDATE
+            SET candidates = candidate_stats.candidates + EXCLUDED.candidates;
+        END IF;
+        IF FOUND THEN
+            DELETE FROM candidate_stats WHERE candidates <= 0;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER candidate_stats_ai AFTER INSERT ON candidates
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_candidate_stats()
+    """,
+    """
+    CREATE TRIGGER candidate_stats_au AFTER UPDATE ON candidates
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_candidate_stats()
+    """,
+    """
+    CREATE TRIGGER candidate_stats_ad AFTER DELETE ON candidates
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_candidate_stats()
+    """,
+]
+
+
+# External content FTS5 table kept in sync with candidates by triggers,
+# SQLite counterpart of the Postgres trigram indexes
+SQLITE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS candidates_fts USING fts5(
+        first_name, last_name,
+        content='candidates', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS candidates_fts_ai AFTER INSERT ON candidates BEGIN
+        INSERT INTO candidates_fts(rowid, first_name, last_name)
+        VALUES (new.id, new.first_name, new.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS candidates_fts_ad AFTER DELETE ON candidates BEGIN
+        INSERT INTO candidates_fts(candidates_fts, rowid, first_name, last_name)
+        VALUES ('delete', old.id, old.first_name, old.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS candidates_fts_au AFTER UPDATE ON candidates BEGIN
+        INSERT INTO candidates_fts(candidates_fts, rowid, first_name, last_name)
+        VALUES ('delete', old.id, old.first_name, old.last_name);
+        INSERT INTO candidates_fts(rowid, first_name, last_name)
+        VALUES (new.id, new.first_name, new.last_name);
+    END
+    """,
+]
+
+event.listen(
+    Candidate.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+for statement in SQLITE_FTS_DDL:
+    event.listen(
+        Candidate.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite"),
+    )
+for statement in SQLITE_DELETION_DDL:
+    event.listen(
+        Candidate.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite"),
+    )
+for statement in POSTGRES_DELETION_DDL:
+    event.listen(
+        Candidate.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
+for statement in SQLITE_STATS_DDL:
+    event.listen(
+        Candidate.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite"),
+    )
+for statement in POSTGRES_STATS_DDL:
+    event.listen(
+        Candidate.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
+event.listen(
+    Candidate.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS candidates_fts").execute_if(dialect="sqlite"),
+)
+event.listen(
+    Candidate.__table__,
+    "after_drop",
+    DDL("DROP FUNCTION IF EXISTS record_candidate_deletion()").execute_if(
+        dialect="postgresql"
+    ),
+)
+event.listen(
+    Candidate.__table__,
+    "after_drop",
+    DDL("DROP FUNCTION IF EXISTS apply_candidate_stats()").execute_if(
+        dialect="postgresql"
+    ),
+)
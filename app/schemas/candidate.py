@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, field_validator
 
 
 class CandidateBase(BaseModel):
@@ -24,3 +25,108 @@ class CandidateCreateResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class CandidateBulkError(BaseModel):
+    """
+    Schema for a row rejected by bulk candidate ingestion
+    """
+
+    row: int
+    errors: list
+
+
+class CandidateBulkResponse(BaseModel):
+    """
+    Schema for returning the outcome of bulk candidate ingestion
+    """
+
+    created: int
+    ids: list[int]
+    errors: list[CandidateBulkError]
+
+
+class CandidateSelection(BaseModel):
+    """
+    Schema for picking the candidates of a batch write, by ids and/or the
+    /all-candidates search filters
+    """
+
+    ids: Optional[list[int]] = None
+    search_by_name: Optional[str] = None
+    search_by_experience: Optional[int] = None
+
+
+class CandidateChanges(BaseModel):
+    """
+    Schema for the fields a batch update sets, unset fields are kept
+    """
+
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    experience: Optional[int] = None
+
+    @field_validator("first_name", "last_name", "experience")
+    @classmethod
+    def not_null(cls, value):
+        # Omit a field to keep it, the columns themselves take no NULL
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+
+class CandidateBatchUpdate(CandidateSelection):
+    """
+    Schema for updating every selected candidate the same way
+    """
+
+    changes: CandidateChanges
+
+
+class CandidateBatchResponse(BaseModel):
+    """
+    Schema for returning the outcome of a batch update or delete
+    """
+
+    affected: int
+    ids: list[int]
+
+
+class ExperienceCount(BaseModel):
+    """
+    Schema for one bucket of the experience histogram
+    """
+
+    experience: Optional[int]
+    candidates: int
+
+
+class UserCount(BaseModel):
+    """
+    Schema for the number of candidates owned by a user
+    """
+
+    user_id: Optional[int]
+    candidates: int
+
+
+class ExperienceStats(BaseModel):
+    """
+    Schema for the experience distribution of candidates
+    """
+
+    histogram: list[ExperienceCount]
+    min: Optional[int]
+    max: Optional[int]
+    mean: Optional[float]
+    percentiles: dict[str, int]
+
+
+class CandidateStatsResponse(BaseModel):
+    """
+    Schema for returning aggregate candidate statistics
+    """
+
+    total_candidates: int
+    experience: ExperienceStats
+    users: list[UserCount]
@@ -0,0 +1,162 @@
+import io
+import csv
+import json
+from typing import Optional
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import app.models.candidate as CandidateModel
+
+CANDIDATE_FIELDS = ["user_id", "first_name", "last_name", "experience"]
+
+
+def detect_format(content_type: str, filename: str = "") -> str:
+    """Work out the payload format of a bulk upload
+    Args:
+        content_type (str): content type of the body or uploaded file
+        filename (str): name of the uploaded file, if any
+    Returns:
+        str: "json", "ndjson" or "csv"
+    Raises:
+        ValueError: if the format is not supported
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/ndjson") or (
+        filename.endswith((".ndjson", ".jsonl"))
+    ):
+        return "ndjson"
+    if content_type in ("text/csv", "application/csv") or filename.endswith(".csv"):
+        return "csv"
+    if content_type == "application/json" or filename.endswith(".json"):
+        return "json"
+    raise ValueError(f"Unsupported content type '{content_type}'")
+
+
+def parse_rows(payload: bytes, payload_format: str) -> list:
+    """Split a bulk upload into raw candidate rows
+    Args:
+        payload (bytes): request body or uploaded file content
+        payload_format (str): "json", "ndjson" or "csv"
+    Returns:
+        list: one dict (or unparseable raw value) per row
+    Raises:
+        ValueError: if a JSON array payload cannot be decoded
+    """
+    content = payload.decode("utf-8-sig")
+    if payload_format == "csv":
+        return list(csv.DictReader(io.StringIO(content)))
+    if payload_format == "ndjson":
+        rows = []
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                rows.append(line)
+        return rows
+    rows = json.loads(content)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of candidates")
+    return rows
+
+
+async def insert_candidates(db: AsyncSession, rows: list, batch_size: int) -> list:
+    """Insert validated candidate rows in batches and return their ids
+    Args:
+        Session (database session)
+        rows (list): dicts with the CANDIDATE_FIELDS keys
+        batch_size (int): rows per executemany batch
+    Returns:
+        list: ids of the created candidates
+    """
+    dialect = db.bind.dialect
+    if dialect.name == "postgresql" and dialect.driver == "asyncpg":
+        return await copy_candidates(db, rows)
+
+    statement = insert(CandidateModel.Candidate).returning(
+        CandidateModel.Candidate.id, sort_by_parameter_order=True
+    )
+    ids = []
+    for start in range(0, len(rows), batch_size):
+        result = await db.execute(statement, rows[start : start + batch_size])
+        ids.extend(result.scalars().all())
+    return ids
+
+
+async def copy_candidates(db: AsyncSession, rows: list) -> list:
+    """Load candidate rows through COPY into a staging table, then move them
+    into candidates with a single INSERT ... SELECT ... RETURNING
+    Args:
+        Session (database session)
+        rows (list): dicts with the CANDIDATE_FIELDS keys
+    Returns:
+        list: ids of the created candidates
+    """
+    await db.execute(
+        text(
+            "CREATE TEMP TABLE candidates_bulk_load "
+            "(seq integer, user_id integer, first_name varchar, "
+            "last_name varchar, experience integer) ON COMMIT DROP"
+        )
+    )
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        "candidates_bulk_load",
+        records=[
+            (seq, *(row[field] for field in CANDIDATE_FIELDS))
+            for seq, row in enumerate(rows)
+        ],
+        columns=["seq", *CANDIDATE_FIELDS],
+    )
+    result = await db.execute(
+        text(
+            "INSERT INTO candidates (user_id, first_name, last_name, experience) "
+            "SELECT user_id, first_name, last_name, experience "
+            "FROM candidates_bulk_load ORDER BY seq RETURNING id"
+        )
+    )
+    return list(result.scalars().all())
+
+
+async def write_in_chunks(
+    db: AsyncSession,
+    statement,
+    selection,
+    chunk_size: int,
+    ids: Optional[list] = None,
+) -> list:
+    """Run a set based UPDATE or DELETE over the candidates a query selects,
+    one chunk of ids per statement, all in the caller's transaction
+    Args:
+        Session (database session)
+        statement (Update | Delete): statement on candidates, without WHERE
+        selection (Select): filtered query of candidate ids
+        chunk_size (int): rows written per statement
+        ids (list | None): explicit ids, narrowed further by the selection
+    Returns:
+        list: ids of the written rows, in ascending order
+    """
+    candidate_id = CandidateModel.Candidate.id
+    statement = statement.returning(candidate_id).execution_options(
+        synchronize_session=False
+    )
+    written = []
+    if ids is not None:
+        ids = sorted(set(ids))
+        for start in range(0, len(ids), chunk_size):
+            chunk = selection.where(candidate_id.in_(ids[start : start + chunk_size]))
+            rows = await db.scalars(statement.where(candidate_id.in_(chunk)))
+            written.extend(sorted(rows))
+        return written
+
+    # Walk the selection by id, so rows an update leaves matching the
+    # filters are not picked up again
+    while True:
+        chunk = selection.order_by(candidate_id).limit(chunk_size)
+        if written:
+            chunk = chunk.where(candidate_id > written[-1])
+        rows = sorted(await db.scalars(statement.where(candidate_id.in_(chunk))))
+        if not rows:
+            return written
+        written.extend(rows)
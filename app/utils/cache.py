@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Every cache built by make_cache, by name, so their stats can be reported
+CACHES = {}
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries also expire after ttl seconds
+    """
+
+    backend = "memory"
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    async def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def add(self, key: str, value: Any) -> Optional[Any]:
+        """Set key only when it holds no live entry
+        Args:
+            key (str): cache key
+            value (Any): value to store
+        Returns:
+            Any | None: the live entry that was kept, None when value was stored
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return None
+
+    async def set_newer(self, key: str, value: dict) -> Optional[dict]:
+        """Set key unless its live entry has the same or a newer "version",
+        so a slow writer cannot put back a row a faster one replaced
+        Args:
+            key (str): cache key
+            value (dict): value to store, with a "version"
+        Returns:
+            dict | None: the live entry that was kept, None when value was stored
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and entry[0] > time.monotonic()
+                and entry[1].get("version", 0) >= value["version"]
+            ):
+                return entry[1]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return None
+
+    async def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+            self.invalidations += len(keys)
+
+    async def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class RedisCache:
+    """
+    Cache shared by all workers through Redis, values are stored as JSON
+    """
+
+    backend = "redis"
+
+    def __init__(self, name: str, client, ttl: float):
+        self.name = name
+        self.client = client
+        self.ttl = ttl
+        self.prefix = f"cache:{name}:"
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    async def set(self, key: str, value: Any):
+        await self.client.set(
+            self.prefix + key, json.dumps(value), px=int(self.ttl * 1000)
+        )
+
+    async def add(self, key: str, value: Any) -> Optional[Any]:
+        """Set key only when it holds no live entry, atomically across workers
+        Args:
+            key (str): cache key
+            value (Any): value to store
+        Returns:
+            Any | None: the live entry that was kept, None when value was stored
+        """
+        while True:
+            stored = await self.client.set(
+                self.prefix + key, json.dumps(value), px=int(self.ttl * 1000), nx=True
+            )
+            if stored:
+                return None
+            existing = await self.client.get(self.prefix + key)
+            # Retry when the entry expired between the two calls
+            if existing is not None:
+                return json.loads(existing)
+
+    async def set_newer(self, key: str, value: dict) -> Optional[dict]:
+        """Set key unless its live entry has the same or a newer "version",
+        atomically across workers through WATCH/MULTI
+        Args:
+            key (str): cache key
+            value (dict): value to store, with a "version"
+        Returns:
+            dict | None: the live entry that was kept, None when value was stored
+        """
+        from redis.exceptions import WatchError
+
+        async with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    await pipe.watch(self.prefix + key)
+                    existing = await pipe.get(self.prefix + key)
+                    if existing is not None:
+                        existing = json.loads(existing)
+                        if existing.get("version", 0) >= value["version"]:
+                            await pipe.unwatch()
+                            return existing
+                    pipe.multi()
+                    pipe.set(
+                        self.prefix + key, json.dumps(value), px=int(self.ttl * 1000)
+                    )
+                    await pipe.execute()
+                    return None
+                except WatchError:
+                    # Another worker wrote the key meanwhile, compare again
+                    continue
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+            self.invalidations += len(keys)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+    def stats(self) -> dict:
+        # Evictions happen inside Redis under its maxmemory policy and show
+        # up as evicted_keys in INFO stats
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+def make_cache(name: str, maxsize: int, ttl: float):
+    """Build a cache on the backend selected by CACHE_BACKEND
+    Args:
+        name (str): cache name, used as key prefix and in stats
+        maxsize (int): entry limit of the in-process backend
+        ttl (float): seconds an entry stays valid
+    Returns:
+        TTLCache | RedisCache: the cache instance
+    """
+    if os.getenv("CACHE_BACKEND", "memory") == "redis":
+        import redis.asyncio as redis
+
+        client = redis.from_url(os.getenv("CACHE_REDIS_URL", "redis://localhost:6379"))
+        cache = RedisCache(name, client, ttl)
+    else:
+        cache = TTLCache(name, maxsize, ttl)
+    CACHES[name] = cache
+    return cache
+
+
+def cache_stats() -> dict:
+    """
+    Function to return hit/miss stats of every cache
+    """
+    return {name: cache.stats() for name, cache in CACHES.items()}
@@ -0,0 +1,94 @@
+import os
+import json
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.cache import make_cache
+
+COUNT_MODES = ("exact", "estimated", "cached")
+
+# normalized filter -> total rows, trades a few seconds of staleness for
+# skipping the COUNT(*) on every list page
+count_cache = make_cache(
+    "candidate_count",
+    maxsize=int(os.getenv("COUNT_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("COUNT_CACHE_TTL", 30)),
+)
+
+
+def count_cache_key(**filters) -> str:
+    # Name search is case insensitive on every backend, so is the key
+    return "|".join(
+        f"{name}={str(value).strip().lower()}"
+        for name, value in sorted(filters.items())
+        if value not in (None, "")
+    )
+
+
+async def exact_count(db: AsyncSession, query) -> int:
+    return await db.scalar(select(func.count()).select_from(query.subquery()))
+
+
+async def estimated_count(db: AsyncSession, query, table: str, filtered: bool):
+    """Row count from the Postgres planner statistics
+    Args:
+        Session (database session)
+        query (Select): filtered query to count
+        table (str): table the query reads
+        filtered (bool): whether the query has any filter
+    Returns:
+        int | None: estimate, None when the planner has nothing to offer
+    """
+    if not filtered:
+        # reltuples is -1 until the table has been vacuumed or analyzed
+        reltuples = await db.scalar(
+            text(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"
+            ),
+            {"table": table},
+        )
+        return reltuples if reltuples is not None and reltuples >= 0 else None
+
+    # Compile with named binds so the statement can be wrapped in text()
+    compiled = query.compile(dialect=postgresql.dialect(paramstyle="named"))
+    plan = await db.scalar(
+        text(f"EXPLAIN (FORMAT JSON) {compiled.string}"), compiled.params
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_rows(
+    db: AsyncSession,
+    query,
+    count_mode: str,
+    table: str,
+    filtered: bool,
+    cache_key: str,
+) -> int:
+    """Total rows of a list query, counted the way count_mode asks for
+    Args:
+        Session (database session)
+        query (Select): filtered query to count
+        count_mode (str): "exact", "estimated" (planner statistics, exact on
+            backends without them) or "cached" (short TTL memoized count)
+        table (str): table the query reads
+        filtered (bool): whether the query has any filter
+        cache_key (str): normalized filter, see count_cache_key
+    Returns:
+        int: total rows
+    """
+    if count_mode == "estimated" and db.bind.dialect.name == "postgresql":
+        estimate = await estimated_count(db, query, table, filtered)
+        if estimate is not None:
+            return estimate
+
+    if count_mode == "cached":
+        total = await count_cache.get(cache_key)
+        if total is None:
+            total = await exact_count(db, query)
+            await count_cache.set(cache_key, total)
+        return total
+
+    return await exact_count(db, query)
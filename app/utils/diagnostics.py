@@ -0,0 +1,166 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Optional
+from sqlalchemy import event
+from app.utils.metrics import current_request, route_template
+
+DIAGNOSTICS_ENABLED = os.getenv("DIAGNOSTICS_ENABLED", "false").lower() == "true"
+# Statements slower than this are reported with their plan
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+# A request running the same statement more than this many times is an N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 10))
+DIAGNOSTICS_BUFFER_SIZE = int(os.getenv("DIAGNOSTICS_BUFFER_SIZE", 100))
+
+
+def statement_shape(statement: str) -> str:
+    # Statements are already parameterised, only the whitespace can differ
+    return " ".join(statement.split())
+
+
+def explain(conn, statement: str, parameters, executemany: bool) -> list:
+    """Capture the plan of a statement on the connection that ran it
+    Args:
+        conn (Connection): connection the statement ran on
+        statement (str): statement as sent to the DBAPI
+        parameters: DBAPI parameters of the statement
+        executemany (bool): True for executemany batches
+    Returns:
+        list: plan lines, or a single line explaining why there is none
+    """
+    if executemany:
+        return ["not captured for executemany"]
+
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        # ANALYZE runs the statement again, only do that for reads
+        if statement.lstrip()[:6].upper() == "SELECT":
+            prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+        else:
+            prefix = "EXPLAIN "
+    elif dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return [f"not supported on {dialect}"]
+
+    # A raw DBAPI cursor bypasses the engine events, so the EXPLAIN is not
+    # itself timed or reported
+    cursor = conn.connection.cursor()
+    try:
+        if dialect == "postgresql":
+            # Keep a failing EXPLAIN from aborting the request's transaction
+            cursor.execute("SAVEPOINT query_diagnostics")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception as e:
+            if dialect == "postgresql":
+                cursor.execute("ROLLBACK TO SAVEPOINT query_diagnostics")
+            return [f"EXPLAIN failed: {e}"]
+        if dialect == "postgresql":
+            cursor.execute("RELEASE SAVEPOINT query_diagnostics")
+    finally:
+        cursor.close()
+    return [" ".join(str(value) for value in row) for row in rows]
+
+
+class QueryDiagnostics:
+    """
+    Engine hooks flagging slow statements and N+1 patterns, keeping the
+    latest findings in a ring buffer
+    """
+
+    def __init__(
+        self,
+        slow_query_ms: float = SLOW_QUERY_THRESHOLD_MS,
+        n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD,
+        buffer_size: int = DIAGNOSTICS_BUFFER_SIZE,
+    ):
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._findings = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    def install(self, engine):
+        """Attach the hooks to a sync engine, or the sync_engine of an
+        AsyncEngine
+        Args:
+            engine (Engine): engine to watch
+        """
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        context._diagnostics_started = time.perf_counter()
+
+    def after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        elapsed_ms = (time.perf_counter() - context._diagnostics_started) * 1000
+        request = current_request.get()
+
+        if elapsed_ms > self.slow_query_ms:
+            self.record(
+                "slow_query",
+                request,
+                statement,
+                explain(conn, statement, parameters, executemany),
+                duration_ms=round(elapsed_ms, 3),
+            )
+
+        if request is not None:
+            shape = statement_shape(statement)
+            count = request.statements.get(shape, 0) + 1
+            request.statements[shape] = count
+            # Report once per request, when the threshold is first crossed
+            if count == self.n_plus_one_threshold + 1:
+                self.record(
+                    "n_plus_one",
+                    request,
+                    statement,
+                    explain(conn, statement, parameters, executemany),
+                    count=count,
+                )
+
+    def record(self, kind: str, request, statement: str, plan: list, **details):
+        scope = request.scope if request is not None else None
+        finding = {
+            "kind": kind,
+            "method": scope.get("method") if scope else None,
+            "route": route_template(scope) if scope else None,
+            "statement": statement_shape(statement),
+            "plan": plan,
+            "recorded_at": time.time(),
+            **details,
+        }
+        logging.warning(
+            f"Query diagnostics: {kind} on {finding['method']} {finding['route']}: "
+            f"{finding['statement'][:200]}"
+        )
+        with self._lock:
+            self._findings.append(finding)
+
+    def findings(self, kind: Optional[str] = None, limit: Optional[int] = None):
+        """Latest findings, newest first
+        Args:
+            kind (str | None): only return slow_query or n_plus_one findings
+            limit (int | None): maximum number of findings
+        Returns:
+            list: findings
+        """
+        with self._lock:
+            findings = [
+                f for f in reversed(self._findings) if kind in (None, f["kind"])
+            ]
+        return findings[:limit] if limit else findings
+
+    def clear(self):
+        with self._lock:
+            self._findings.clear()
+
+
+diagnostics = QueryDiagnostics()
@@ -0,0 +1,78 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+
+def candidate_etag(id: int, version: int) -> str:
+    """
+    Function to return the strong ETag of a candidate row version
+    """
+    return f'"candidate-{id}-v{version}"'
+
+
+def if_match_versions(header: Optional[str], id: int) -> Optional[set]:
+    """Candidate versions named by an If-Match header, so the precondition
+    can be checked by the UPDATE itself
+    Args:
+        header (str | None): raw header value, may list several tags or "*"
+        id (int): candidate id
+    Returns:
+        set | None: acceptable versions, None when any version will do
+    """
+    if not header or header.strip() == "*":
+        return None
+    prefix = f'"candidate-{id}-v'
+    versions = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        # If-Match uses the strong comparison, a weak tag never matches
+        if tag.startswith("W/"):
+            continue
+        version = tag[len(prefix) : -1]
+        if tag.startswith(prefix) and tag.endswith('"') and version.isdigit():
+            versions.add(int(version))
+    return versions
+
+
+def list_etag(*parts) -> str:
+    """Strong ETag for a list page, derived from the (id, version) pairs of
+    its rows plus anything else that shapes the payload
+    Args:
+        parts: values the page depends on
+    Returns:
+        str: quoted ETag
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"list-{digest}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag, with the weak
+    comparison it calls for
+    Args:
+        header (str | None): raw header value, may list several tags or "*"
+        etag (str): current ETag of the resource
+    Returns:
+        bool: True if the header names the current representation
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in tags
+
+
+def not_modified(request: Request, response: Response, etag: str):
+    """Attach the ETag to the response and short circuit conditional GETs
+    Args:
+        request (Request): incoming request
+        response (Response): response FastAPI will send on success
+        etag (str): current ETag of the resource
+    Returns:
+        Response | None: 304 response if the client copy is current
+    """
+    response.headers["ETag"] = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
@@ -1,27 +1,96 @@
 import os
 import jwt
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
-from dotenv import load_dotenv
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from app.constants import ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 from fastapi import HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordBearer
 
 
-load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+_pwd_context = None
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt runs in its own processes so a login burst cannot starve the API,
+# one per CPU unless set
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1)
+# Jobs allowed to wait for a free worker before callers get a 503
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32))
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(
+    PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE
+)
+
+
+def get_pwd_context():
+    """
+    Function to return the passlib context, created on first use so only the
+    processes that hash passwords load passlib and bcrypt
+    """
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """
+    Function to return the password hashing process pool, created on first use
+    """
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_pool
+
+
+async def run_password_job(func, *args):
+    """Run a bcrypt function in the hashing pool, failing fast when it is full
+    Args:
+        func (callable): hash_password or verify_password
+        args: arguments for func
+    Returns:
+        result of func
+    Raises:
+        HTTPException: 503 when every worker and queue slot is taken
+    """
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many password requests, please try again shortly.",
+        )
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_pool(), func, *args)
+    finally:
+        _hash_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await run_password_job(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_password_job(verify_password, plain_password, hashed_password)
 
 
 def create_access_token(
@@ -0,0 +1,222 @@
+import os
+import time
+import threading
+import contextvars
+from typing import Optional
+from sqlalchemy import event
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "false").lower() == "true"
+
+
+class RequestMetrics:
+    """
+    DB work done while serving one request
+    """
+
+    __slots__ = ("queries", "db_seconds", "scope", "statements")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.scope = scope
+        # statement -> executions, filled in by the query diagnostics
+        self.statements = {}
+
+
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+class Histogram:
+    """
+    Prometheus style cumulative histogram, one series per label set
+    """
+
+    def __init__(self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                base = format_labels(label_names, labels)
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(
+                        f'{self.name}_bucket{{{base},le="{bound}"}} {bucket_count}'
+                    )
+                lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{base}}} {total}")
+                lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+class Counter:
+    """
+    Prometheus style counter, one series per label set
+    """
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, value: float = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + value
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._series.items()):
+                lines.append(
+                    f"{self.name}{{{format_labels(label_names, labels)}}} {value}"
+                )
+        return lines
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple, values: tuple) -> str:
+    return ",".join(
+        f'{name}="{escape_label(value)}"' for name, value in zip(names, values)
+    )
+
+
+def gauge_lines(name: str, help: str, series: dict, label_names: tuple) -> list:
+    """Render numeric values as a Prometheus gauge
+    Args:
+        name (str): metric name
+        help (str): metric description
+        series (dict): label values tuple -> number, non numeric values skipped
+        label_names (tuple): names of the labels
+    Returns:
+        list: exposition lines
+    """
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    for labels, value in series.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"{name}{{{format_labels(label_names, labels)}}} {value}")
+    return lines
+
+
+REQUEST_LABELS = ("method", "route", "status")
+ROUTE_LABELS = ("method", "route")
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time spent serving HTTP requests"
+)
+request_db_duration = Histogram(
+    "http_request_db_duration_seconds", "Time spent in DB queries per HTTP request"
+)
+request_db_queries = Counter(
+    "http_request_db_queries_total", "DB queries issued while serving HTTP requests"
+)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = current_request.get()
+    if metrics is not None:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - context._metrics_started
+
+
+def instrument_engine(engine):
+    """Attach the query timing hooks to a sync engine, or the sync_engine of
+    an AsyncEngine
+    Args:
+        engine (Engine): engine to instrument
+    """
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def route_template(scope: dict) -> str:
+    # Use the route pattern, not the raw path, to keep label cardinality low
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def server_timing(metrics: RequestMetrics, elapsed: float) -> bytes:
+    return (
+        f'db;dur={metrics.db_seconds * 1000:.2f};desc="{metrics.queries} queries", '
+        f"app;dur={(elapsed - metrics.db_seconds) * 1000:.2f}, "
+        f"total;dur={elapsed * 1000:.2f}"
+    ).encode()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, DB time and query count per route
+    """
+
+    def __init__(self, app, server_timing: Optional[bool] = None):
+        self.app = app
+        self.server_timing = SERVER_TIMING if server_timing is None else server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(scope)
+        token = current_request.set(metrics)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    elapsed = time.perf_counter() - started
+                    headers.append((b"server-timing", server_timing(metrics, elapsed)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            route = route_template(scope)
+            request_duration.observe((scope["method"], route, status_code), elapsed)
+            request_db_duration.observe((scope["method"], route), metrics.db_seconds)
+            request_db_queries.inc((scope["method"], route), metrics.queries)
+
+
+def render_metrics(extra_lines: list = ()) -> str:
+    """
+    Function to render every metric in Prometheus text exposition format
+    """
+    lines = [
+        *request_duration.render(REQUEST_LABELS),
+        *request_db_duration.render(ROUTE_LABELS),
+        *request_db_queries.render(ROUTE_LABELS),
+        *extra_lines,
+    ]
+    return "\n".join(lines) + "\n"
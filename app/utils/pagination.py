@@ -0,0 +1,40 @@
+import json
+import base64
+from typing import Optional
+
+NEXT = "next"
+PREV = "prev"
+
+
+def encode_cursor(key: int, direction: str) -> str:
+    """Build an opaque cursor pointing at a row key
+    Args:
+        key (int): sort key of the boundary row
+        direction (str): "next" or "prev"
+    Returns:
+        str: url safe cursor string
+    """
+    payload = json.dumps({"k": key, "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> tuple[Optional[int], str]:
+    """Decode a cursor built by encode_cursor
+    Args:
+        cursor (str | None): cursor string, None for the first page
+    Returns:
+        tuple: (sort key or None, direction)
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    if not cursor:
+        return None, NEXT
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key, direction = int(payload["k"]), payload["d"]
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if direction not in (NEXT, PREV):
+        raise ValueError("Invalid cursor direction")
+    return key, direction
@@ -0,0 +1,91 @@
+import asyncio
+from typing import AsyncIterator, Callable
+import anyio
+
+# Celery states after which a task never changes again
+FINAL_STATES = {"SUCCESS", "FAILURE", "REVOKED"}
+
+
+class TaskWatch:
+    """
+    Latest known state of one task, shared by all its subscribers
+    """
+
+    def __init__(self):
+        self.event = None
+        self.version = 0
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.poller = None
+
+    def publish(self, event: dict):
+        self.event = event
+        self.version += 1
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class ProgressHub:
+    """
+    Fans task state out to every subscriber, polling the result backend once
+    per task and interval however many clients are listening
+    """
+
+    def __init__(self, fetch: Callable[[str], dict], interval: float):
+        self.fetch = fetch
+        self.interval = interval
+        self._watches = {}
+
+    def watching(self) -> int:
+        return len(self._watches)
+
+    async def _poll(self, task_id: str, watch: TaskWatch):
+        while True:
+            try:
+                event = await anyio.to_thread.run_sync(self.fetch, task_id)
+            except Exception as e:
+                watch.publish(
+                    {"state": "FAILURE", "error": f"Progress unavailable: {e}"}
+                )
+                return
+            if event != watch.event:
+                watch.publish(event)
+            if event["state"] in FINAL_STATES:
+                return
+            await asyncio.sleep(self.interval)
+
+    async def subscribe(
+        self, task_id: str, heartbeat: float = 15
+    ) -> AsyncIterator[dict]:
+        """Yield every new state of a task until it is final
+        Args:
+            task_id (str): celery task id
+            heartbeat (float): seconds without change after which None is
+                yielded, so idle connections can be kept alive
+        Returns:
+            AsyncIterator: state dicts with at least a "state" key, or None
+        """
+        watch = self._watches.get(task_id)
+        if watch is None:
+            watch = self._watches[task_id] = TaskWatch()
+            watch.poller = asyncio.create_task(self._poll(task_id, watch))
+        watch.subscribers += 1
+        seen = 0
+        try:
+            while True:
+                changed = watch.changed
+                if watch.version > seen:
+                    seen = watch.version
+                    yield watch.event
+                    if watch.event["state"] in FINAL_STATES:
+                        return
+                    continue
+                try:
+                    await asyncio.wait_for(changed.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            watch.subscribers -= 1
+            if not watch.subscribers:
+                watch.poller.cancel()
+                self._watches.pop(task_id, None)
@@ -0,0 +1,227 @@
+import time
+import asyncio
+import threading
+import contextvars
+from typing import Optional
+from anyio import to_thread
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+# Set on responses to requests that wrote to the primary, while present the
+# client's reads stay on the primary too
+STICKY_COOKIE = "db_primary"
+
+# Lag of a Postgres standby, 0 when it has replayed everything it received
+# or when it is not a standby at all
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+            OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+"""
+
+# Leading keywords of textual SQL that only reads, any other text() statement
+# goes to the primary
+READ_ONLY_SQL = ("SELECT", "EXPLAIN", "SHOW")
+
+
+class RequestWrites:
+    """
+    Whether the current request wrote to the primary
+    """
+
+    __slots__ = ("wrote",)
+
+    def __init__(self):
+        self.wrote = False
+
+
+current_writes = contextvars.ContextVar("current_writes", default=None)
+
+
+def replica_lag(conn) -> float:
+    """Replication lag of the server behind a connection, in seconds
+    Args:
+        conn (Connection): connection to the replica
+    Returns:
+        float: lag, always 0 for SQLite which only proves the file is readable
+    """
+    if conn.dialect.name == "postgresql":
+        return float(conn.scalar(text(POSTGRES_LAG_SQL)))
+    conn.execute(text("SELECT 1"))
+    return 0.0
+
+
+class Replica:
+    """
+    A read replica, with a sync engine for Celery tasks and health checks
+    and an async engine for the API
+    """
+
+    def __init__(self, url: str, engine, async_engine):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = engine
+        self.async_engine = async_engine
+        self.healthy = False
+        self.lag = None
+        self.error = None
+        # A dropped connection takes the replica out until the next check
+        event.listen(async_engine.sync_engine, "handle_error", self.on_error)
+        event.listen(engine, "handle_error", self.on_error)
+
+    def on_error(self, context):
+        if context.is_disconnect:
+            self.healthy = False
+            self.error = str(context.original_exception)
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "error": self.error,
+        }
+
+
+class ReplicaSet:
+    """
+    Read replicas in rotation, checked every check_interval seconds, one
+    lagging more than max_lag seconds or failing its check sits out
+    """
+
+    def __init__(self, replicas: list, max_lag: float, check_interval: float):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.checked_at = None
+        self._next = 0
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def check(self):
+        """
+        Function to measure the lag of every replica and update the rotation
+        """
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    replica.lag = replica_lag(conn)
+                replica.healthy = replica.lag <= self.max_lag
+                replica.error = None if replica.healthy else "lagging"
+            except Exception as e:
+                replica.healthy, replica.lag, replica.error = False, None, str(e)
+        self.checked_at = time.monotonic()
+
+    def check_due(self) -> bool:
+        return (
+            self.checked_at is None
+            or time.monotonic() - self.checked_at >= self.check_interval
+        )
+
+    def choose(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        with self._lock:
+            self._next += 1
+            return healthy[self._next % len(healthy)]
+
+    def pick(self) -> Optional[Replica]:
+        """Healthy replica for a sync session, round robin
+        Returns:
+            Replica | None: None when no replica is usable, read the primary
+        """
+        if self.replicas and self.check_due():
+            with self._lock:
+                if self.check_due():
+                    self.check()
+        return self.choose()
+
+    async def pick_async(self) -> Optional[Replica]:
+        """Healthy replica for an async session, the checks run in a thread
+        and only one request waits for them
+        Returns:
+            Replica | None: None when no replica is usable, read the primary
+        """
+        if self.replicas and self.check_due() and not self._async_lock.locked():
+            async with self._async_lock:
+                if self.check_due():
+                    await to_thread.run_sync(self.check)
+        return self.choose()
+
+    def stats(self) -> dict:
+        return {replica.name: replica.stats() for replica in self.replicas}
+
+
+class RoutingSession(Session):
+    """
+    Session reading from the replica engine put in info["replica"], if any.
+    Inserts, updates, deletes, flushes, textual SQL other than reads and raw
+    connections go to the primary, and so does everything after them, so a
+    session always reads its own writes
+    """
+
+    def writes(self, mapper=None, clause=None) -> bool:
+        if self._flushing or isinstance(clause, UpdateBase):
+            return True
+        if isinstance(clause, TextClause):
+            return not clause.text.lstrip().upper().startswith(READ_ONLY_SQL)
+        # A bare connection() may be used for anything, COPY included
+        return mapper is None and clause is None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = self.info.get("replica")
+        if self.writes(mapper, clause):
+            self.info.pop("replica", None)
+            writes = current_writes.get()
+            if writes is not None:
+                writes.wrote = True
+        elif replica is not None:
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware keeping a client on the primary for sticky_seconds after
+    a request of it wrote there, replicas may not have that write yet
+    """
+
+    def __init__(self, app, replicas: ReplicaSet, sticky_seconds: float):
+        self.app = app
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        writes = RequestWrites()
+        token = current_writes.set(writes)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and writes.wrote:
+                cookie = (
+                    f"{STICKY_COOKIE}=1; Max-Age={int(self.sticky_seconds)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                headers = [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_writes.reset(token)
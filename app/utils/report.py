@@ -0,0 +1,205 @@
+import os
+import csv
+import gzip
+import json
+import hashlib
+import shutil
+import importlib.util
+from typing import Iterable, NamedTuple, Optional
+
+REPORT_HEADER = ["ID", "First Name", "Last Name", "Experience"]
+
+REPORT_GZIP_LEVEL = int(os.getenv("REPORT_GZIP_LEVEL", 6))
+REPORT_ZSTD_LEVEL = int(os.getenv("REPORT_ZSTD_LEVEL", 3))
+
+
+class ReportFormat(NamedTuple):
+    extension: str
+    media_type: str
+    # Optional package the format needs, None for the standard library
+    module: Optional[str] = None
+
+
+REPORT_FORMATS = {
+    "csv": ReportFormat(".csv", "text/csv"),
+    "gzip": ReportFormat(".csv.gz", "application/gzip"),
+    "zstd": ReportFormat(".csv.zst", "application/zstd", "zstandard"),
+    "ndjson": ReportFormat(".ndjson", "application/x-ndjson"),
+    "parquet": ReportFormat(".parquet", "application/vnd.apache.parquet", "pyarrow"),
+    "arrow": ReportFormat(".arrow", "application/vnd.apache.arrow.file", "pyarrow"),
+}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def shard_ranges(low: int, high: int, shards: int) -> list:
+    """Split the id range [low, high] into at most shards half open ranges
+    Args:
+        low (int): smallest id
+        high (int): largest id
+        shards (int): wanted number of ranges
+    Returns:
+        list: (start, stop) pairs in ascending order
+    """
+    span = high - low + 1
+    step = -(-span // max(1, min(shards, span)))
+    return [
+        (start, min(start + step, high + 1)) for start in range(low, high + 1, step)
+    ]
+
+
+def write_report(path: str, rows: Iterable, header: bool = True) -> int:
+    """Write the report rows, after the header unless header is False
+    Args:
+        path (str): file to write
+        rows (Iterable): (id, first_name, last_name, experience) rows
+        header (bool): whether to start with the header row
+    Returns:
+        int: number of rows written
+    """
+    row_count = 0
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        if header:
+            writer.writerow(REPORT_HEADER)
+        for row in rows:
+            writer.writerow(row)
+            row_count += 1
+    return row_count
+
+
+def merge_report(snapshot_path: str, changed: Iterable, deleted: set, path: str):
+    """Apply changed and deleted rows to the previous report, both the
+    snapshot and the changes being ordered by id
+    Args:
+        snapshot_path (str): previous report
+        changed (Iterable): inserted or updated rows, ordered by id
+        deleted (set): ids of deleted candidates
+        path (str): file to write the merged report to
+    Returns:
+        int: number of rows written
+    """
+    row_count = 0
+    changes = iter(changed)
+    change = next(changes, None)
+    with open(snapshot_path, newline="") as src, open(path, "w", newline="") as dst:
+        reader = csv.reader(src)
+        next(reader, None)
+        writer = csv.writer(dst)
+        writer.writerow(REPORT_HEADER)
+        for row in reader:
+            id = int(row[0])
+            while change is not None and change[0] < id:
+                writer.writerow(change)
+                row_count += 1
+                change = next(changes, None)
+            if change is not None and change[0] == id:
+                writer.writerow(change)
+                row_count += 1
+                change = next(changes, None)
+            elif id not in deleted:
+                writer.writerow(row)
+                row_count += 1
+        while change is not None:
+            writer.writerow(change)
+            row_count += 1
+            change = next(changes, None)
+    return row_count
+
+
+def concat_report_parts(paths: list, path: str):
+    """Join headerless report parts, in the given order, under one header
+    Args:
+        paths (list): part files, removed once copied
+        path (str): file to write
+    """
+    with open(path, "w", newline="") as dst:
+        csv.writer(dst).writerow(REPORT_HEADER)
+        for part_path in paths:
+            with open(part_path, newline="") as src:
+                shutil.copyfileobj(src, dst)
+            os.remove(part_path)
+
+
+def format_available(report_format: str) -> bool:
+    module = REPORT_FORMATS[report_format].module
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def report_format_of(path: str) -> str:
+    # Longest extension first, .csv.gz must not be taken for .gz
+    for name, report_format in sorted(
+        REPORT_FORMATS.items(), key=lambda item: -len(item[1].extension)
+    ):
+        if path.endswith(report_format.extension):
+            return name
+    return "csv"
+
+
+def convert_report(csv_path: str, path: str, report_format: str):
+    """Stream the CSV report into another format
+    Args:
+        csv_path (str): CSV report
+        path (str): file to write
+        report_format (str): gzip, zstd, ndjson, parquet or arrow
+    """
+    if report_format == "gzip":
+        # mtime=0 keeps the output, and so its ETag, stable for equal content
+        with open(csv_path, "rb") as src, gzip.GzipFile(
+            path, "wb", compresslevel=REPORT_GZIP_LEVEL, mtime=0
+        ) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+    elif report_format == "zstd":
+        import zstandard
+
+        with open(csv_path, "rb") as src, open(path, "wb") as dst:
+            zstandard.ZstdCompressor(level=REPORT_ZSTD_LEVEL).copy_stream(src, dst)
+    elif report_format == "ndjson":
+        with open(csv_path, newline="") as src, open(path, "w") as dst:
+            reader = csv.reader(src)
+            next(reader, None)
+            for id, first_name, last_name, experience in reader:
+                row = {
+                    "id": int(id),
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "experience": int(experience) if experience else None,
+                }
+                dst.write(json.dumps(row) + "\n")
+    elif report_format in ("parquet", "arrow"):
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("first_name", pa.string()),
+                ("last_name", pa.string()),
+                ("experience", pa.int64()),
+            ]
+        )
+        # Record batches are parsed and written one block at a time
+        batches = pa_csv.open_csv(
+            csv_path,
+            read_options=pa_csv.ReadOptions(column_names=schema.names, skip_rows=1),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(column_types=schema),
+        )
+        if report_format == "parquet":
+            import pyarrow.parquet as pq
+
+            with pq.ParquetWriter(path, schema) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+        else:
+            with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+    else:
+        raise ValueError(f"Unknown report format {report_format}")
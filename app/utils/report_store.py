@@ -0,0 +1,213 @@
+import os
+import glob
+import json
+import time
+import tempfile
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
+from app.utils.report import REPORT_FORMATS, report_format_of
+
+# Unfinished temporary files older than this are left overs of crashed runs
+STALE_TEMP_SECONDS = 24 * 3600
+
+
+class ReportStore:
+    """
+    Directory of immutable report artifacts named by kind, data version
+    (the SHA-256 of the CSV content) and format. Equal content maps to the
+    same file, so it is built once and reused; files are evicted least
+    recently used first once the store grows over its byte budget
+    """
+
+    def __init__(self, directory: str, budget_bytes: int):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        self.tmp_dir = os.path.join(directory, "tmp")
+        self.budget_bytes = budget_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _ensure_dirs(self):
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, kind: str, version: str, report_format: str) -> str:
+        extension = REPORT_FORMATS[report_format].extension
+        return os.path.join(self.objects_dir, f"{kind}-{version}{extension}")
+
+    def get(self, kind: str, version: str, report_format: str) -> Optional[str]:
+        """Path of a stored artifact, marked as recently used
+        Args:
+            kind (str): report kind
+            version (str): data version
+            report_format (str): one of REPORT_FORMATS
+        Returns:
+            str | None: path, None when it is not stored
+        """
+        path = self.path(kind, version, report_format)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def temp_path(self) -> str:
+        """
+        Function to return a new empty file to build an artifact in
+        """
+        self._ensure_dirs()
+        fd, path = tempfile.mkstemp(dir=self.tmp_dir)
+        os.close(fd)
+        return path
+
+    def put(
+        self,
+        temp_path: str,
+        kind: str,
+        version: str,
+        report_format: str,
+        keep: Iterable[str] = (),
+    ) -> str:
+        """Move a finished temporary file into the store, or drop it when the
+        same artifact is already there
+        Args:
+            temp_path (str): file from temp_path
+            kind (str): report kind
+            version (str): data version
+            report_format (str): one of REPORT_FORMATS
+            keep (Iterable): other paths eviction must not touch
+        Returns:
+            str: path of the stored artifact
+        """
+        self._ensure_dirs()
+        path = self.path(kind, version, report_format)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            os.utime(path)
+        else:
+            os.replace(temp_path, path)
+        self.evict(keep=[path, *keep])
+        return path
+
+    def state_path(self, kind: str) -> str:
+        return os.path.join(self.directory, f"{kind}.state.json")
+
+    def load_state(self, kind: str) -> Optional[dict]:
+        """State of the latest report of a kind
+        Args:
+            kind (str): report kind
+        Returns:
+            dict | None: sha256, rows and watermark, None when a full build is
+            needed because there is no state or its CSV was evicted
+        """
+        try:
+            with open(self.state_path(kind)) as file:
+                state = json.load(file)
+            state["watermark"] = datetime.fromisoformat(state["watermark"])
+        except (OSError, ValueError, KeyError):
+            return None
+        if not os.path.exists(self.path(kind, state["sha256"], "csv")):
+            return None
+        return state
+
+    def save_state(self, kind: str, state: dict):
+        temp_path = self.temp_path()
+        with open(temp_path, "w") as file:
+            json.dump({**state, "watermark": state["watermark"].isoformat()}, file)
+        os.replace(temp_path, self.state_path(kind))
+
+    def remove_state(self, kind: str):
+        try:
+            os.remove(self.state_path(kind))
+        except FileNotFoundError:
+            pass
+
+    def pinned(self) -> set:
+        # The CSV each state points at is the base of the next incremental run
+        pinned = set()
+        for state_path in glob.glob(os.path.join(self.directory, "*.state.json")):
+            kind = os.path.basename(state_path).removesuffix(".state.json")
+            state = self.load_state(kind)
+            if state is not None:
+                pinned.add(self.path(kind, state["sha256"], "csv"))
+        return pinned
+
+    def artifacts(self) -> list:
+        """
+        Function to return (path, size, last used) of every stored artifact
+        """
+        artifacts = []
+        try:
+            entries = list(os.scandir(self.objects_dir))
+        except FileNotFoundError:
+            return artifacts
+        for entry in entries:
+            try:
+                stat_result = entry.stat()
+            except FileNotFoundError:
+                continue
+            artifacts.append((entry.path, stat_result.st_size, stat_result.st_mtime))
+        return artifacts
+
+    def evict(self, keep: Iterable[str] = ()):
+        """Remove least recently used artifacts until the store fits its budget
+        Args:
+            keep (Iterable): paths that must not be removed
+        """
+        keep = {*keep, *self.pinned()}
+        artifacts = sorted(self.artifacts(), key=lambda artifact: artifact[2])
+        total = sum(size for _, size, _ in artifacts)
+        for path, size, _ in artifacts:
+            if total <= self.budget_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+        cutoff = time.time() - STALE_TEMP_SECONDS
+        for temp_path in glob.glob(os.path.join(self.tmp_dir, "*")):
+            try:
+                if os.stat(temp_path).st_mtime < cutoff:
+                    os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+
+    def describe(self, path: str) -> tuple:
+        """Kind, data version and format of a stored artifact path"""
+        report_format = report_format_of(path)
+        name = os.path.basename(path).removesuffix(
+            REPORT_FORMATS[report_format].extension
+        )
+        kind, _, version = name.rpartition("-")
+        return kind, version, report_format
+
+    def stats(self) -> dict:
+        """
+        Function to return the size of the store and its reuse counters,
+        the counters are per process
+        """
+        artifacts = self.artifacts()
+        lookups = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "artifacts": len(artifacts),
+            "bytes": sum(size for _, size, _ in artifacts),
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
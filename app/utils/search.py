@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, or_
+import app.models.candidate as CandidateModel
+
+# Lightweight handle on the SQLite FTS5 table, kept out of Base.metadata
+# so create_all does not try to build it as a regular table
+candidates_fts = Table(
+    "candidates_fts",
+    MetaData(),
+    Column("rowid", Integer),
+    Column("candidates_fts", String),
+    Column("first_name", String),
+    Column("last_name", String),
+    Column("rank"),
+)
+
+# The trigram tokenizer cannot match terms shorter than one trigram
+MIN_TRIGRAM_LENGTH = 3
+
+
+def apply_name_search(query, search_by_name: str, dialect: str):
+    """Filter a candidate query by a substring of first or last name
+    Args:
+        query (Query): candidate query to filter
+        search_by_name (str): name substring to look for
+        dialect (str): name of the database dialect in use
+    Returns:
+        tuple: (filtered query, relevance ordering or None)
+    """
+    candidate = CandidateModel.Candidate
+
+    if dialect == "sqlite" and len(search_by_name) >= MIN_TRIGRAM_LENGTH:
+        phrase = '"' + search_by_name.replace('"', '""') + '"'
+        query = query.join(candidates_fts, candidates_fts.c.rowid == candidate.id)
+        query = query.filter(candidates_fts.c.candidates_fts.op("MATCH")(phrase))
+        # bm25 rank, lower is more relevant
+        return query, candidates_fts.c.rank.asc()
+
+    query = query.filter(
+        or_(
+            candidate.first_name.ilike(f"%{search_by_name}%"),
+            candidate.last_name.ilike(f"%{search_by_name}%"),
+        )
+    )
+    if dialect == "postgresql":
+        # ilike with a leading wildcard is served by the gin_trgm_ops indexes
+        similarity = func.greatest(
+            func.similarity(candidate.first_name, search_by_name),
+            func.similarity(candidate.last_name, search_by_name),
+        )
+        return query, similarity.desc()
+    return query, None
@@ -0,0 +1,113 @@
+import math
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.candidate import Candidate, CandidateStat
+
+STATS_PERCENTILES = (25, 50, 75, 90, 95, 99)
+
+
+def histogram_percentiles(histogram: list, percentiles: tuple = STATS_PERCENTILES):
+    """Nearest rank percentiles of a histogram
+    Args:
+        histogram (list): (value, count) pairs sorted by value
+        percentiles (tuple): percentiles to compute, 0 < p <= 100
+    Returns:
+        dict: "p<percentile>" -> value, empty for an empty histogram
+    """
+    total = sum(count for _, count in histogram)
+    if not total:
+        return {}
+    result = {}
+    for percentile in percentiles:
+        rank, seen = max(1, math.ceil(percentile / 100 * total)), 0
+        for value, count in histogram:
+            seen += count
+            if seen >= rank:
+                result[f"p{percentile}"] = value
+                break
+    return result
+
+
+def summarize(experience_rows: list, user_rows: list) -> dict:
+    """Shape the grouped summary rows into the stats payload
+    Args:
+        experience_rows (list): (experience, candidates) sorted by experience,
+            NULL experience last
+        user_rows (list): (user_id, candidates) sorted by user_id
+    Returns:
+        dict: totals, experience histogram with percentiles, per user counts
+    """
+    known = [(value, count) for value, count in experience_rows if value is not None]
+    known_total = sum(count for _, count in known)
+    return {
+        "total_candidates": sum(count for _, count in experience_rows),
+        "experience": {
+            "histogram": [
+                {"experience": value, "candidates": count}
+                for value, count in experience_rows
+            ],
+            "min": known[0][0] if known else None,
+            "max": known[-1][0] if known else None,
+            "mean": (
+                round(sum(value * count for value, count in known) / known_total, 2)
+                if known_total
+                else None
+            ),
+            "percentiles": histogram_percentiles(known),
+        },
+        "users": [
+            {"user_id": user_id, "candidates": count} for user_id, count in user_rows
+        ],
+    }
+
+
+async def candidate_stats(db: AsyncSession) -> dict:
+    """Aggregate candidate statistics, read from the candidate_stats summary
+    so the cost follows the number of distinct (user, experience) pairs
+    rather than the number of candidates
+    Args:
+        Session (database session)
+    Returns:
+        dict: stats payload, see summarize
+    """
+    total = func.sum(CandidateStat.candidates)
+    experience_rows = (
+        await db.execute(
+            select(CandidateStat.experience, total)
+            .group_by(CandidateStat.experience)
+            .order_by(CandidateStat.experience.is_(None), CandidateStat.experience)
+        )
+    ).all()
+    user_rows = (
+        await db.execute(
+            select(CandidateStat.user_id, total)
+            .group_by(CandidateStat.user_id)
+            .order_by(CandidateStat.user_id.is_(None), CandidateStat.user_id)
+        )
+    ).all()
+    return summarize(experience_rows, user_rows)
+
+
+def refresh_candidate_stats(db: Session) -> int:
+    """Rebuild candidate_stats from candidates, repairing any drift from
+    writes that bypassed the triggers
+    Args:
+        Session (sync database session)
+    Returns:
+        int: number of summary rows written
+    """
+    if db.bind.dialect.name == "postgresql":
+        # Hold off writers so no trigger delta lands between the two steps
+        db.execute(text("LOCK TABLE candidates IN SHARE MODE"))
+    db.execute(delete(CandidateStat))
+    result = db.execute(
+        insert(CandidateStat).from_select(
+            ["user_id", "experience", "candidates"],
+            select(Candidate.user_id, Candidate.experience, func.count()).group_by(
+                Candidate.user_id, Candidate.experience
+            ),
+        )
+    )
+    db.commit()
+    return result.rowcount
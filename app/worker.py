@@ -0,0 +1,215 @@
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from itertools import chain
+from celery import Celery, chord, group
+from sqlalchemy import func, select
+import app.api.report as report
+import app.models.candidate as CandidateModel
+from app.database import SessionLocal, read_session
+from app.utils.report import (
+    concat_report_parts,
+    merge_report,
+    shard_ranges,
+    write_report,
+)
+from app.utils.stats import refresh_candidate_stats
+
+# Celery app and tasks, kept out of the API import path: the API loads this
+# module the first time it queues a task or looks one up
+celery = Celery(
+    "tasks",
+    broker=os.getenv("CELERY_BROKER_URL"),
+    backend=os.getenv("CELERY_RESULT_BACKEND"),
+)
+# Picked up tasks leave PENDING, so the API can tell a lost one from a
+# running one
+celery.conf.task_track_started = True
+
+# Seconds between two rebuilds of the candidate_stats summary by Celery beat,
+# a fallback for writes that bypass its triggers, 0 disables the schedule
+CANDIDATE_STATS_REFRESH_INTERVAL = float(
+    os.getenv("CANDIDATE_STATS_REFRESH_INTERVAL", 3600)
+)
+
+
+@celery.task(bind=True)
+def export_report_shard(self, index: int, start: int, stop: int, path: str) -> dict:
+    """
+    Function to write the candidates with start <= id < stop to a report
+    part, as one of the parallel subtasks of a full report build
+    """
+    with read_session() as db:
+        rows = db.execute(
+            report.report_query()
+            .where(
+                CandidateModel.Candidate.id >= start,
+                CandidateModel.Candidate.id < stop,
+            )
+            .execution_options(yield_per=report.REPORT_CHUNK_SIZE)
+        )
+        # Reported on this shard's own id, task_progress adds the shards up
+        rows = report.track_progress(self, f"shard {index}", report.stream(rows))
+        row_count = write_report(path, rows, header=False)
+    return {"index": index, "path": path, "rows": row_count}
+
+
+@celery.task
+def merge_report_shards(
+    parts: list, watermark: str, started: float, report_format: str = "csv"
+):
+    """
+    Function to join the report parts, in id range order, into the report,
+    called by the chord once every shard is written
+    """
+    with SessionLocal() as db:
+        partial_path = report.report_store.temp_path()
+        try:
+            parts = sorted(parts, key=lambda part: part["index"])
+            concat_report_parts([part["path"] for part in parts], partial_path)
+            return report.publish_report(
+                db,
+                partial_path,
+                sum(part["rows"] for part in parts),
+                None,
+                datetime.fromisoformat(watermark),
+                started,
+                report_format,
+            )
+        finally:
+            report.discard(partial_path)
+
+
+@celery.task(bind=True)
+def generate_report_task(self, report_format: str = "csv"):
+    """
+    Function to generate report as a celery task. The first run streams every
+    candidate into the report, split over REPORT_SHARDS parallel subtasks
+    when more than one, later runs apply only the rows inserted, updated or
+    deleted since the previous one and reuse the stored artifact when its
+    content did not change
+    """
+    store = report.report_store
+    with read_session() as db:
+
+        # Each run builds in its own temporary file, concurrent runs never
+        # write to the same path
+        partial_path = store.temp_path()
+        try:
+            logging.info("Generating report task started")
+            started = time.time()
+            state = store.load_state(report.REPORT_KIND)
+            # Taken before reading, whatever commits later is in the next run
+            watermark = db.scalar(select(func.now()))
+
+            if state is None:
+                low, high = db.execute(
+                    select(
+                        func.min(CandidateModel.Candidate.id),
+                        func.max(CandidateModel.Candidate.id),
+                    )
+                ).one()
+                ranges = shard_ranges(low, high, report.REPORT_SHARDS) if low else []
+                if len(ranges) > 1:
+                    shard_ids = [
+                        f"{self.request.id}-shard-{index}"
+                        for index in range(len(ranges))
+                    ]
+                    shards = group(
+                        export_report_shard.s(
+                            index, start, stop, store.temp_path()
+                        ).set(task_id=shard_ids[index])
+                        for index, (start, stop) in enumerate(ranges)
+                    )
+                    # Shards overwrite their own state only, the client
+                    # follows this id and finds them here
+                    self.update_state(
+                        state="PROGRESS",
+                        meta={"phase": "shards", "rows": 0, "shards": shard_ids},
+                    )
+                    # The chord result takes over this task's id
+                    return self.replace(
+                        chord(
+                            shards,
+                            merge_report_shards.s(
+                                watermark.isoformat(), started, report_format
+                            ),
+                        )
+                    )
+                rows = db.execute(
+                    report.report_query().execution_options(
+                        yield_per=report.REPORT_CHUNK_SIZE
+                    )
+                )
+                row_count = write_report(
+                    partial_path,
+                    report.track_progress(self, "export", report.stream(rows)),
+                )
+            else:
+                since = state["watermark"] - timedelta(
+                    seconds=report.REPORT_CHANGE_OVERLAP
+                )
+                deleted = set(
+                    db.scalars(
+                        select(CandidateModel.CandidateDeletion.candidate_id).where(
+                            CandidateModel.CandidateDeletion.deleted_at >= since
+                        )
+                    )
+                )
+                changed = report.stream(
+                    db.execute(
+                        report.report_query()
+                        .where(CandidateModel.Candidate.updated_at >= since)
+                        .execution_options(yield_per=report.REPORT_CHUNK_SIZE)
+                    )
+                )
+                first_change = next(changed, None)
+                if first_change is None and not deleted:
+                    logging.info(
+                        f"Generating report task completed: no changes, serving "
+                        f"{state['sha256']}"
+                    )
+                    store.save_state(
+                        report.REPORT_KIND, {**state, "watermark": watermark}
+                    )
+                    return report.export_report(state["sha256"], report_format)
+                if first_change is not None:
+                    changed = chain([first_change], changed)
+                base_path = store.path(report.REPORT_KIND, state["sha256"], "csv")
+                changed = report.track_progress(self, "merge", changed)
+                row_count = merge_report(base_path, changed, deleted, partial_path)
+
+            return report.publish_report(
+                db,
+                partial_path,
+                row_count,
+                state,
+                watermark,
+                started,
+                report_format,
+            )
+
+        finally:
+            report.discard(partial_path)
+            db.close()
+
+
+@celery.task
+def refresh_candidate_stats_task() -> int:
+    """
+    Function to rebuild the candidate_stats summary as a celery task
+    """
+    with SessionLocal() as db:
+        rows = refresh_candidate_stats(db)
+    logging.info(f"Candidate stats refreshed, {rows} summary rows")
+    return rows
+
+
+if CANDIDATE_STATS_REFRESH_INTERVAL > 0:
+    celery.conf.beat_schedule = {
+        "refresh-candidate-stats": {
+            "task": refresh_candidate_stats_task.name,
+            "schedule": CANDIDATE_STATS_REFRESH_INTERVAL,
+        }
+    }
@@ -0,0 +1,85 @@
+"""Bulk ingestion benchmark
+
+Loads candidates through POST /candidates/bulk and, for comparison, through
+one POST /candidates per row, and prints the throughput of both in rows/sec.
+
+    python -m benchmarks.bulk_ingest --rows 100000 --single-rows 1000
+
+Uses DATABASE_URL when set, otherwise a throwaway SQLite file.
+"""
+
+import time
+import json
+import asyncio
+import argparse
+
+from benchmarks.common import auth_headers, create_tables, make_client
+
+USERNAME = "bench-bulk-user"
+PASSWORD = "bench-bulk-password"
+
+
+def make_rows(count: int) -> list:
+    return [
+        {"first_name": f"First{i}", "last_name": f"Last{i}", "experience": i % 40}
+        for i in range(count)
+    ]
+
+
+async def run(rows: int, single_rows: int, formats: list):
+    async with make_client() as c:
+        headers = await auth_headers(c, USERNAME, PASSWORD)
+
+        payloads = {
+            "json": (json.dumps(make_rows(rows)), "application/json"),
+            "ndjson": (
+                "\n".join(json.dumps(row) for row in make_rows(rows)),
+                "application/x-ndjson",
+            ),
+            "csv": (
+                "first_name,last_name,experience\n"
+                + "\n".join(
+                    f"{r['first_name']},{r['last_name']},{r['experience']}"
+                    for r in make_rows(rows)
+                ),
+                "text/csv",
+            ),
+        }
+        for payload_format in formats:
+            body, content_type = payloads[payload_format]
+            started = time.perf_counter()
+            response = await c.post(
+                "/candidates/bulk",
+                content=body,
+                headers={**headers, "Content-Type": content_type},
+            )
+            elapsed = time.perf_counter() - started
+            created = response.json()["created"]
+            print(
+                f"mode=bulk-{payload_format} rows={created} "
+                f"seconds={elapsed:.2f} rows_per_sec={created / elapsed:.0f}"
+            )
+
+        started = time.perf_counter()
+        for row in make_rows(single_rows):
+            await c.post("/candidates", json=row, headers=headers)
+        elapsed = time.perf_counter() - started
+        print(
+            f"mode=single rows={single_rows} "
+            f"seconds={elapsed:.2f} rows_per_sec={single_rows / elapsed:.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--single-rows", type=int, default=1000)
+    parser.add_argument("--formats", nargs="+", default=["json", "ndjson", "csv"])
+    args = parser.parse_args()
+
+    create_tables()
+    asyncio.run(run(args.rows, args.single_rows, args.formats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Shared setup for the benchmarks
+
+Importing this module points the app at DATABASE_URL when set, otherwise at a
+throwaway SQLite file, so it must be imported before anything from app.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models.candidate import Candidate  # noqa: E402
+
+SEED_BATCH_SIZE = 10000
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def make_client(base_url: str = None) -> httpx.AsyncClient:
+    """Client for the app in process, or for a running server at base_url"""
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=None)
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None)
+
+
+async def auth_headers(client: httpx.AsyncClient, username: str, password: str):
+    """Register the user if needed and return bearer auth headers"""
+    await client.post("/user", json={"username": username, "password": password})
+    response = await client.post(
+        "/login", data={"username": username, "password": password}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def create_tables():
+    Base.metadata.create_all(bind=engine)
+
+
+def seed_candidates(total: int) -> int:
+    """Top the candidates table up to at least total rows
+    Args:
+        total (int): wanted number of candidates
+    Returns:
+        int: number of rows inserted
+    """
+    with SessionLocal() as db:
+        existing = db.scalar(select(func.count()).select_from(Candidate))
+        for start in range(existing, total, SEED_BATCH_SIZE):
+            db.execute(
+                insert(Candidate),
+                [
+                    {
+                        "first_name": f"First{i}",
+                        "last_name": f"Last{i}",
+                        "experience": i % 40,
+                    }
+                    for i in range(start, min(start + SEED_BATCH_SIZE, total))
+                ],
+            )
+            db.commit()
+    return max(0, total - existing)
@@ -0,0 +1,68 @@
+"""Compare two benchmark result files
+
+Matches results by endpoint and dataset size and prints the change of each
+latency percentile and of throughput. Exits with status 1 when any p95 or
+throughput figure regressed by more than the threshold.
+
+    python -m benchmarks.compare baseline.json benchmarks/results/latest.json
+"""
+
+import sys
+import json
+import argparse
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        data = json.load(file)
+    return {(r["endpoint"], r["dataset_size"]): r for r in data["results"]}
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Print the per endpoint deltas and collect regressions
+    Args:
+        baseline (dict): results keyed by (endpoint, dataset size)
+        current (dict): results keyed by (endpoint, dataset size)
+        threshold (float): allowed regression in percent
+    Returns:
+        list: descriptions of regressions beyond the threshold
+    """
+    regressions = []
+    for key in sorted(baseline.keys() & current.keys(), key=str):
+        before, after = baseline[key], current[key]
+        deltas = {
+            metric: change(before[metric], after[metric])
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+        }
+        print(
+            f"{key[0]:<40} size={key[1]:<8} "
+            + " ".join(f"{metric}={delta:+.1f}%" for metric, delta in deltas.items())
+        )
+        if deltas["p95_ms"] > threshold:
+            regressions.append(f"{key[0]} size={key[1]} p95 {deltas['p95_ms']:+.1f}%")
+        if -deltas["throughput_rps"] > threshold:
+            regressions.append(
+                f"{key[0]} size={key[1]} throughput {deltas['throughput_rps']:+.1f}%"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    regressions = compare(load(args.baseline), load(args.current), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
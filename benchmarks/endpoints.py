@@ -0,0 +1,196 @@
+"""Endpoint latency benchmark suite
+
+Seeds the candidates table to each requested size, drives the main endpoints
+under concurrency and reports p50/p95/p99 latency and throughput per endpoint
+and dataset size. Results are written as JSON so runs from different commits
+can be compared with benchmarks.compare.
+
+    python -m benchmarks.endpoints --sizes 1000 100000 1000000
+    python -m benchmarks.endpoints --base-url http://localhost:8000
+
+Runs the app in process by default, with Celery in eager mode so
+/generate-report measures the report itself. With --base-url it drives a
+running server instead, which must use the same DATABASE_URL for seeding.
+Seeding only ever adds rows, so sizes are run in ascending order.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from benchmarks.common import (
+    auth_headers,
+    create_tables,
+    engine,
+    make_client,
+    percentile,
+    seed_candidates,
+)
+import app.worker as worker
+
+USERNAME = "bench-endpoints-user"
+PASSWORD = "bench-endpoints-password"
+
+
+async def drive(client, name: str, make_request, requests: int, concurrency: int):
+    """Fire requests through a fixed number of concurrent workers
+    Args:
+        client (AsyncClient): http client
+        name (str): endpoint label used in the results
+        make_request (callable): coroutine factory taking the client
+        requests (int): total number of requests
+        concurrency (int): requests in flight at once
+    Returns:
+        dict: latency percentiles, throughput and error count
+    """
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await make_request(client)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "endpoint": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+    }
+
+
+async def run_size(client, size: int, args) -> list:
+    headers = await auth_headers(client, USERNAME, PASSWORD)
+    pages = max(1, size // 10)
+
+    scenarios = [
+        (
+            "GET /all-candidates",
+            lambda c: c.get(
+                f"/all-candidates?page={random.randint(1, pages)}&page_size=10",
+                headers=headers,
+            ),
+            args.requests,
+            args.concurrency,
+        ),
+        (
+            "GET /all-candidates?search_by_name",
+            lambda c: c.get(
+                f"/all-candidates?search_by_name=First{random.randint(1, size)}",
+                headers=headers,
+            ),
+            args.requests,
+            args.concurrency,
+        ),
+        (
+            "GET /candidates/{id}",
+            lambda c: c.get(f"/candidates/{random.randint(1, size)}", headers=headers),
+            args.requests,
+            args.concurrency,
+        ),
+        (
+            "POST /login",
+            lambda c: c.post(
+                "/login", data={"username": USERNAME, "password": PASSWORD}
+            ),
+            args.login_requests,
+            args.concurrency,
+        ),
+        (
+            "GET /generate-report",
+            lambda c: c.get("/generate-report"),
+            args.report_requests,
+            1,
+        ),
+    ]
+    results = []
+    for name, make_request, requests, concurrency in scenarios:
+        if args.only and name not in args.only:
+            continue
+        result = await drive(client, name, make_request, requests, concurrency)
+        result["dataset_size"] = size
+        results.append(result)
+        print(
+            f"size={size} endpoint={name!r} p50={result['p50_ms']}ms "
+            f"p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+            f"rps={result['throughput_rps']} errors={result['errors']}"
+        )
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+async def run(args) -> dict:
+    results = []
+    async with make_client(args.base_url) as client:
+        for size in sorted(args.sizes):
+            started = time.perf_counter()
+            inserted = seed_candidates(size)
+            print(f"seeded {inserted} rows in {time.perf_counter() - started:.1f}s")
+            results.extend(await run_size(client, size, args))
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "database": engine.dialect.name,
+            "target": args.base_url or "in-process",
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--login-requests", type=int, default=20)
+    parser.add_argument("--report-requests", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--base-url", help="drive a running server instead")
+    parser.add_argument("--only", nargs="+", help="endpoint labels to run")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    create_tables()
+    if not args.base_url:
+        worker.celery.conf.task_always_eager = True
+
+    baseline = asyncio.run(run(args))
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(baseline, file, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
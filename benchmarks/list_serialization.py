@@ -0,0 +1,102 @@
+"""List page serialization benchmark
+
+Builds /all-candidates pages both ways and prints the time per row:
+
+- orm: full Candidate objects, CandidateBase.from_orm per row, then FastAPI
+  response model validation and the stdlib JSONResponse, as the endpoint
+  did before the projected fast path
+- projected: the endpoint's column projection into plain dicts, encoded by
+  ORJSONResponse
+
+    python -m benchmarks.list_serialization --page-sizes 10 100 500 1000
+
+Uses DATABASE_URL when set, otherwise a throwaway SQLite file.
+"""
+
+import time
+import asyncio
+import argparse
+
+from benchmarks.common import create_tables, seed_candidates
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from sqlalchemy import select
+from app.main import app
+from app.database import AsyncSessionLocal
+from app.models.candidate import Candidate
+from app.schemas.candidate import CandidateBase
+from app.api.candidate import LIST_COLUMNS, list_payload
+
+
+def list_response_field():
+    for route in app.routes:
+        if getattr(route, "path", None) == "/all-candidates":
+            return route.response_field
+    raise LookupError("/all-candidates route not found")
+
+
+def page(candidates: list) -> dict:
+    return {
+        "total_candidates": len(candidates),
+        "page": 1,
+        "page_size": len(candidates),
+        "total_pages": 1,
+        "candidates": candidates,
+    }
+
+
+async def orm_page(db, page_size: int, field) -> bytes:
+    rows = (await db.scalars(select(Candidate).limit(page_size))).all()
+    content = page([CandidateBase.from_orm(row) for row in rows])
+    return JSONResponse(
+        await serialize_response(field=field, response_content=content)
+    ).body
+
+
+async def projected_page(db, page_size: int, field) -> bytes:
+    rows = (await db.execute(select(*LIST_COLUMNS).limit(page_size))).all()
+    return ORJSONResponse(page(list_payload(rows))).body
+
+
+async def measure(build, page_size: int, repeat: int, field) -> float:
+    """Best time over repeat runs, in seconds. A new session per run so the
+    ORM identity map starts empty, as it does in a request"""
+    best = float("inf")
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await build(db, page_size, field)
+            best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def run(page_sizes: list, repeat: int):
+    field = list_response_field()
+    for page_size in page_sizes:
+        results = {
+            mode: await measure(build, page_size, repeat, field)
+            for mode, build in (("orm", orm_page), ("projected", projected_page))
+        }
+        print(
+            f"page_size={page_size} "
+            + " ".join(
+                f"{mode}_us_per_row={seconds / page_size * 1e6:.1f}"
+                for mode, seconds in results.items()
+            )
+            + f" speedup={results['orm'] / results['projected']:.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    create_tables()
+    seed_candidates(max(args.page_sizes))
+    asyncio.run(run(args.page_sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Login throughput benchmark
+
+Fires a burst of concurrent /login requests while probing /health, once with
+bcrypt on the Starlette threadpool and once on the dedicated hashing process
+pool, and prints login throughput next to the /health latency observed during
+the burst. A starved API shows up as a high /health latency.
+
+    python -m benchmarks.login_throughput --logins 200 --concurrency 50
+
+Uses DATABASE_URL when set, otherwise a throwaway SQLite file.
+"""
+
+import time
+import asyncio
+import argparse
+
+from benchmarks.common import create_tables, make_client, percentile
+from starlette.concurrency import run_in_threadpool
+import app.utils.helper as helper
+
+USERNAME = "bench-login-user"
+PASSWORD = "bench-login-password"
+
+
+async def threadpool_password_job(func, *args):
+    return await run_in_threadpool(func, *args)
+
+
+async def run(mode: str, logins: int, concurrency: int) -> dict:
+    """Drive one burst of logins and measure /health alongside it
+    Args:
+        mode (str): "threadpool" or "process"
+        logins (int): number of login requests
+        concurrency (int): logins in flight at once
+    Returns:
+        dict: throughput and latency figures of the run
+    """
+    original = helper.run_password_job
+    if mode == "threadpool":
+        helper.run_password_job = threadpool_password_job
+
+    async with make_client() as c:
+        await c.post("/user", json={"username": USERNAME, "password": PASSWORD})
+        # Warm up the pool so process start up is not measured
+        await c.post("/login", data={"username": USERNAME, "password": PASSWORD})
+
+        semaphore = asyncio.Semaphore(concurrency)
+        statuses = []
+        health_latencies = []
+        burst_done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                response = await c.post(
+                    "/login", data={"username": USERNAME, "password": PASSWORD}
+                )
+                statuses.append(response.status_code)
+
+        async def probe_health():
+            while not burst_done.is_set():
+                started = time.perf_counter()
+                await c.get("/health")
+                health_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        prober = asyncio.create_task(probe_health())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        burst_done.set()
+        await prober
+
+    helper.run_password_job = original
+    accepted = statuses.count(200)
+    return {
+        "mode": mode,
+        "logins_ok": accepted,
+        "logins_rejected": statuses.count(503),
+        "logins_per_sec": round(accepted / elapsed, 1),
+        "health_p50_ms": round(percentile(health_latencies, 50) * 1000, 2),
+        "health_p99_ms": round(percentile(health_latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    create_tables()
+
+    async def run_all():
+        for mode in ("threadpool", "process"):
+            result = await run(mode, args.logins, args.concurrency)
+            print(" ".join(f"{key}={value}" for key, value in result.items()))
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Startup benchmark
+
+Measures, each time in a fresh interpreter, what it costs to bring the API up:
+
+- import: `python -X importtime -c "import app.main"`, self time summed per
+  top level package, so a new heavy dependency on the import path stands out
+- first response: importing app.main, then serving the first GET /health
+  through httpx's ASGI transport, which also creates the database engines
+
+    python -m benchmarks.startup --runs 5
+
+Prints the best and median of the runs. tests/test_startup.py holds the app
+to STARTUP_IMPORT_BUDGET_MS and STARTUP_FIRST_RESPONSE_BUDGET_MS, and checks
+that none of LAZY_MODULES is loaded by the import.
+
+Uses DATABASE_URL when set, otherwise a throwaway SQLite file.
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use only: the Celery client, password hashing, the server
+# and the database drivers behind the engines
+LAZY_MODULES = (
+    "celery",
+    "kombu",
+    "passlib",
+    "uvicorn",
+    "psycopg2",
+    "asyncpg",
+    "aiosqlite",
+)
+
+# Best of a few runs, in milliseconds, generous enough for a busy CI box
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", 2500))
+FIRST_RESPONSE_BUDGET_MS = float(os.getenv("STARTUP_FIRST_RESPONSE_BUDGET_MS", 3000))
+
+FIRST_RESPONSE_SCRIPT = """
+import sys, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+import asyncio, httpx
+import app.database
+
+LAZY_MODULES = {lazy_modules!r}
+state = {{
+    "loaded": sorted(name for name in LAZY_MODULES if name in sys.modules),
+    "engines_created": app.database._engines is not None,
+}}
+
+
+async def first_response():
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+        return (await client.get("/health")).status_code
+
+
+request_started = time.perf_counter()
+status = asyncio.run(first_response())
+responded = time.perf_counter()
+print(json.dumps({{
+    **state,
+    "status": status,
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (imported - started + responded - request_started) * 1000,
+}}))
+"""
+
+
+def child_env() -> dict:
+    env = {**os.environ, "PYTHONWARNINGS": "ignore"}
+    if not env.get("DATABASE_URL"):
+        env["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/startup.db"
+    env.setdefault("SECRET_KEY", "benchmark")
+    return env
+
+
+def first_response() -> dict:
+    """Import the app and serve one request in a fresh interpreter
+    Returns:
+        dict: import_ms, first_response_ms (import plus the first request,
+            leaving out the http client's own import), status of the
+            response, loaded LAZY_MODULES and whether the import created
+            the engines
+    """
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            FIRST_RESPONSE_SCRIPT.format(lazy_modules=LAZY_MODULES),
+        ],
+        cwd=ROOT,
+        env=child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.splitlines()[-1])
+
+
+def import_profile() -> tuple:
+    """Import app.main under -X importtime
+    Returns:
+        tuple: cumulative import time of app.main in ms, and a Counter of
+            self time in ms per top level package
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT,
+        env=child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total, packages = 0.0, Counter()
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1000
+        if name.strip() == "app.main":
+            total = int(cumulative_us) / 1000
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    total, packages = import_profile()
+    print(f"import app.main under -X importtime: {total:.0f} ms")
+    for package, ms in packages.most_common(args.top):
+        print(f"  {package:<20} {ms:8.1f} ms")
+
+    runs = [first_response() for _ in range(args.runs)]
+    for key, budget in (
+        ("import_ms", IMPORT_BUDGET_MS),
+        ("first_response_ms", FIRST_RESPONSE_BUDGET_MS),
+    ):
+        values = [run[key] for run in runs]
+        print(
+            f"{key}: best={min(values):.0f} median={statistics.median(values):.0f} "
+            f"budget={budget:.0f}"
+        )
+    print(f"lazy modules loaded by the import: {runs[0]['loaded'] or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import asyncio
+import fakeredis
+from app.utils.cache import RedisCache, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    async def scenario():
+        cache = TTLCache("test-lru", maxsize=2, ttl=60)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        assert await cache.get("a") == 1  # "b" is now least recently used
+        await cache.set("c", 3)
+        return cache, await cache.get("b"), await cache.get("c")
+
+    cache, evicted, kept = asyncio.run(scenario())
+    assert evicted is None
+    assert kept == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    async def scenario():
+        cache = TTLCache("test-ttl", maxsize=10, ttl=0)
+        await cache.set("a", 1)
+        return await cache.get("a")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_redis_cache_round_trip():
+    async def scenario():
+        cache = RedisCache("test-redis", fakeredis.FakeAsyncRedis(), ttl=60)
+        await cache.set("1", {"first_name": "Redis"})
+        hit = await cache.get("1")
+        await cache.delete("1")
+        return cache, hit, await cache.get("1")
+
+    cache, hit, after_delete = asyncio.run(scenario())
+    assert hit == {"first_name": "Redis"}
+    assert after_delete is None
+    assert cache.stats()["hit_ratio"] == 0.5
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_add_keeps_the_live_entry():
+    async def scenario(cache):
+        first = await cache.add("report", "task-1")
+        second = await cache.add("report", "task-2")
+        await cache.delete("report")
+        third = await cache.add("report", "task-3")
+        return first, second, third, await cache.get("report")
+
+    for cache in (
+        TTLCache("test-add", maxsize=10, ttl=60),
+        RedisCache("test-add", fakeredis.FakeAsyncRedis(), ttl=60),
+    ):
+        assert asyncio.run(scenario(cache)) == (None, "task-1", None, "task-3")
+
+
+def test_set_newer_keeps_the_newer_version():
+    async def scenario(cache):
+        await cache.set_newer("1", {"name": "v2", "version": 2})
+        kept = await cache.set_newer("1", {"name": "v1", "version": 1})
+        stored = await cache.set_newer("1", {"name": "v3", "version": 3})
+        return kept, stored, await cache.get("1")
+
+    for cache in (
+        TTLCache("test-newer", maxsize=10, ttl=60),
+        RedisCache("test-newer", fakeredis.FakeAsyncRedis(), ttl=60),
+    ):
+        assert asyncio.run(scenario(cache)) == (
+            {"name": "v2", "version": 2},
+            None,
+            {"name": "v3", "version": 3},
+        )
@@ -1,19 +1,31 @@
 import pytest
+from collections import Counter
+import fakeredis
 from fastapi.testclient import TestClient
+import app.api.candidate as candidate_api
+from app.utils.cache import RedisCache, TTLCache
+from app.utils.etag import candidate_etag, if_match_versions
+from app.utils.stats import histogram_percentiles, refresh_candidate_stats
 from app.main import app
 from app.database import Base, get_db
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 # Setup for a test database
 SQLALCHEMY_DATABASE_URL = (
     "sqlite:///./test.db"  # Adjust path as needed for your test environment
 )
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+TestingAsyncSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False, bind=async_engine
+)
 
 
 # Override the get_db dependency for tests
@@ -28,11 +40,17 @@ def test_db():
     Base.metadata.drop_all(bind=engine)  # Drop tables after tests
 
 
+async def override_get_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 @pytest.fixture(scope="module")
 def client(test_db):
-    app.dependency_overrides[get_db] = lambda: test_db
+    app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as c:
         yield c
+    app.dependency_overrides.clear()
 
 
 @pytest.fixture
@@ -128,3 +146,512 @@ def test_fetch_all_candidates(client, auth_headers):
     assert "total_candidates" in data
     assert "candidates" in data
     assert len(data["candidates"]) <= 2  # Page size limit
+
+
+def test_fetch_all_candidates_cursor(client, auth_headers):
+    for i in range(5):
+        client.post(
+            "/candidates",
+            json={"first_name": f"Cursor{i}", "last_name": "Page", "experience": 7},
+            headers=auth_headers,
+        )
+
+    url = "/all-candidates?pagination=cursor&page_size=2&search_by_experience=7"
+    first = client.get(url, headers=auth_headers).json()
+    assert [c["first_name"] for c in first["candidates"]] == ["Cursor0", "Cursor1"]
+    assert first["prev_cursor"] is None
+    assert "total_candidates" not in first
+
+    second = client.get(
+        f"{url}&cursor={first['next_cursor']}", headers=auth_headers
+    ).json()
+    assert [c["first_name"] for c in second["candidates"]] == ["Cursor2", "Cursor3"]
+
+    last = client.get(f"{url}&cursor={second['next_cursor']}", headers=auth_headers)
+    assert [c["first_name"] for c in last.json()["candidates"]] == ["Cursor4"]
+    assert last.json()["next_cursor"] is None
+
+    back = client.get(
+        f"{url}&cursor={second['prev_cursor']}", headers=auth_headers
+    ).json()
+    assert [c["first_name"] for c in back["candidates"]] == ["Cursor0", "Cursor1"]
+    assert back["prev_cursor"] is None
+
+    # A misspelt mode is rejected instead of falling back to offset pages
+    response = client.get(
+        "/all-candidates?pagination=curser&page_size=2", headers=auth_headers
+    )
+    assert response.status_code == 422
+
+
+def test_fetch_all_candidates_search_by_name(client, auth_headers):
+    candidates_data = [
+        {"first_name": "Rosalind", "last_name": "Franklin", "experience": 9},
+        {"first_name": "Frank", "last_name": "Zappa", "experience": 9},
+        {"first_name": "Ada", "last_name": "Lovelace", "experience": 9},
+    ]
+    for candidate_data in candidates_data:
+        client.post("/candidates", json=candidate_data, headers=auth_headers)
+
+    response = client.get("/all-candidates?search_by_name=frank", headers=auth_headers)
+    names = {c["first_name"] for c in response.json()["candidates"]}
+    assert names == {"Rosalind", "Frank"}
+
+    # Terms shorter than a trigram fall back to a plain substring match
+    response = client.get(
+        "/all-candidates?search_by_name=ad&search_by_experience=9",
+        headers=auth_headers,
+    )
+    assert [c["first_name"] for c in response.json()["candidates"]] == ["Ada"]
+
+
+def test_search_index_follows_updates(client, auth_headers):
+    response = client.post(
+        "/candidates",
+        json={"first_name": "Before", "last_name": "Rename", "experience": 1},
+        headers=auth_headers,
+    )
+    candidate_id = response.json()["id"]
+    client.put(
+        f"/candidates/{candidate_id}",
+        json={"first_name": "Afterwards", "last_name": "Rename", "experience": 1},
+        headers=auth_headers,
+    )
+
+    response = client.get(
+        "/all-candidates?search_by_name=afterward", headers=auth_headers
+    )
+    assert [c["first_name"] for c in response.json()["candidates"]] == ["Afterwards"]
+    response = client.get("/all-candidates?search_by_name=before", headers=auth_headers)
+    assert response.json() == "No candidates found."
+
+
+def test_add_candidates_bulk_json(client, auth_headers):
+    payload = [
+        {"first_name": "Bulk", "last_name": "One", "experience": 1},
+        {"first_name": "Bulk", "last_name": "Two", "experience": "not a number"},
+        {"first_name": "Bulk", "last_name": "Three", "experience": 3},
+    ]
+    response = client.post("/candidates/bulk", json=payload, headers=auth_headers)
+
+    data = response.json()
+    assert data["created"] == 2
+    assert [error["row"] for error in data["errors"]] == [2]
+    fetched = client.get(f"/candidates/{data['ids'][1]}", headers=auth_headers)
+    assert fetched.json()["last_name"] == "Three"
+
+
+def test_add_candidates_bulk_ndjson_and_csv(client, auth_headers):
+    ndjson = '{"first_name": "Nd", "last_name": "Json", "experience": 2}\n{oops}\n'
+    response = client.post(
+        "/candidates/bulk",
+        content=ndjson,
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["created"] == 1
+    assert response.json()["errors"][0]["row"] == 2
+
+    csv_content = "first_name,last_name,experience\nCsv,Upload,4\nCsv,Rows,5\n"
+    response = client.post(
+        "/candidates/bulk",
+        files={"file": ("candidates.csv", csv_content, "text/csv")},
+        headers=auth_headers,
+    )
+    assert response.json()["created"] == 2
+    assert response.json()["errors"] == []
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_fetch_candidate_read_through_cache(client, auth_headers, monkeypatch, backend):
+    if backend == "redis":
+        cache = RedisCache("candidate", fakeredis.FakeAsyncRedis(), ttl=60)
+        monkeypatch.setattr(candidate_api, "candidate_cache", cache)
+    cache = candidate_api.candidate_cache
+
+    response = client.post(
+        "/candidates",
+        json={"first_name": "Cached", "last_name": "Read", "experience": 2},
+        headers=auth_headers,
+    )
+    candidate_id = response.json()["id"]
+
+    hits = cache.hits
+    response = client.get(f"/candidates/{candidate_id}", headers=auth_headers)
+    assert response.json()["first_name"] == "Cached"
+    assert cache.hits == hits + 1
+
+    client.put(
+        f"/candidates/{candidate_id}",
+        json={"first_name": "Refreshed", "last_name": "Read", "experience": 3},
+        headers=auth_headers,
+    )
+    response = client.get(f"/candidates/{candidate_id}", headers=auth_headers)
+    assert response.json()["first_name"] == "Refreshed"
+
+    client.delete(f"/candidates/{candidate_id}", headers=auth_headers)
+    response = client.get(f"/candidates/{candidate_id}", headers=auth_headers)
+    assert response.json() == "Candidate not found"
+    assert cache.stats()["invalidations"] >= 1
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_slow_cache_fill_keeps_a_newer_write(
+    client, auth_headers, monkeypatch, backend
+):
+    candidate_id = client.post(
+        "/candidates",
+        json={"first_name": "Before", "last_name": "Race", "experience": 4},
+        headers=auth_headers,
+    ).json()["id"]
+    cache = (
+        RedisCache("candidate", fakeredis.FakeAsyncRedis(), ttl=60)
+        if backend == "redis"
+        else TTLCache("candidate", 100, 60)
+    )
+    monkeypatch.setattr(candidate_api, "candidate_cache", cache)
+    fill = cache.set_newer
+
+    async def fill_after_a_put(key, value):
+        # A PUT commits and caches its row between this GET's read and fill
+        monkeypatch.setattr(cache, "set_newer", fill)
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "UPDATE candidates SET first_name = 'After', "
+                    "version = version + 1 WHERE id = :id"
+                ),
+                {"id": candidate_id},
+            )
+        await fill(
+            key, {**value, "first_name": "After", "version": value["version"] + 1}
+        )
+        return await fill(key, value)
+
+    monkeypatch.setattr(cache, "set_newer", fill_after_a_put)
+    stale = client.get(f"/candidates/{candidate_id}", headers=auth_headers)
+    assert stale.json()["first_name"] == "Before"
+
+    response = client.get(
+        f"/candidates/{candidate_id}",
+        headers={**auth_headers, "If-None-Match": stale.headers["etag"]},
+    )
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "After"
+
+
+def test_candidate_conditional_requests(client, auth_headers):
+    response = client.post(
+        "/candidates",
+        json={"first_name": "Etag", "last_name": "Check", "experience": 1},
+        headers=auth_headers,
+    )
+    candidate_id = response.json()["id"]
+
+    response = client.get(f"/candidates/{candidate_id}", headers=auth_headers)
+    etag = response.headers["etag"]
+    response = client.get(
+        f"/candidates/{candidate_id}",
+        headers={**auth_headers, "If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    updated = {"first_name": "Etag", "last_name": "Changed", "experience": 2}
+    response = client.put(
+        f"/candidates/{candidate_id}",
+        json=updated,
+        headers={**auth_headers, "If-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+    # The old ETag no longer matches, neither for reads nor for writes
+    response = client.get(
+        f"/candidates/{candidate_id}",
+        headers={**auth_headers, "If-None-Match": etag},
+    )
+    assert response.json()["last_name"] == "Changed"
+    response = client.put(
+        f"/candidates/{candidate_id}",
+        json=updated,
+        headers={**auth_headers, "If-Match": etag},
+    )
+    assert response.status_code == 412
+
+
+def test_fetch_all_candidates_not_modified(client, auth_headers):
+    url = "/all-candidates?page=1&page_size=2"
+    response = client.get(url, headers=auth_headers)
+    etag = response.headers["etag"]
+
+    response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    # A new candidate changes the total, so the page is served again
+    client.post(
+        "/candidates",
+        json={"first_name": "Page", "last_name": "Changer", "experience": 1},
+        headers=auth_headers,
+    )
+    response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_fetch_all_candidates_count_modes(client, auth_headers):
+    url = "/all-candidates?search_by_experience=31&page_size=1"
+    for i in range(2):
+        client.post(
+            "/candidates",
+            json={"first_name": f"Count{i}", "last_name": "Mode", "experience": 31},
+            headers=auth_headers,
+        )
+
+    exact = client.get(url, headers=auth_headers).json()
+    assert exact["total_candidates"] == 2
+    assert exact["count_mode"] == "exact"
+    # No planner statistics on SQLite, estimated falls back to an exact count
+    estimated = client.get(f"{url}&count_mode=estimated", headers=auth_headers)
+    assert estimated.json()["total_candidates"] == 2
+    assert (
+        client.get(f"{url}&count_mode=cached", headers=auth_headers).json()[
+            "total_pages"
+        ]
+        == 2
+    )
+
+    client.post(
+        "/candidates",
+        json={"first_name": "Count2", "last_name": "Mode", "experience": 31},
+        headers=auth_headers,
+    )
+    # The memoized count is served until it expires
+    cached = client.get(f"{url}&count_mode=cached", headers=auth_headers).json()
+    assert cached["total_candidates"] == 2
+    assert client.get(url, headers=auth_headers).json()["total_candidates"] == 3
+
+    response = client.get(f"{url}&count_mode=bogus", headers=auth_headers)
+    assert response.status_code == 422
+
+    # Same rows and total, but the body names another count_mode
+    etag = client.get(url, headers=auth_headers).headers["etag"]
+    response = client.get(
+        f"{url}&count_mode=estimated",
+        headers={**auth_headers, "If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.json()["count_mode"] == "estimated"
+
+
+def stats_from_candidates(db):
+    """Same figures as /candidates/stats, aggregated from candidates itself"""
+    rows = db.execute(text("SELECT user_id, experience FROM candidates")).all()
+    histogram, users = Counter(), Counter()
+    for user_id, experience in rows:
+        histogram[experience] += 1
+        users[user_id] += 1
+    return len(rows), dict(histogram), dict(users)
+
+
+def stats_from_endpoint(client, auth_headers):
+    stats = client.get("/candidates/stats", headers=auth_headers).json()
+    histogram = {
+        bucket["experience"]: bucket["candidates"]
+        for bucket in stats["experience"]["histogram"]
+    }
+    users = {user["user_id"]: user["candidates"] for user in stats["users"]}
+    return stats["total_candidates"], histogram, users
+
+
+def test_candidate_stats_follow_writes(client, auth_headers, test_db):
+    created = client.post(
+        "/candidates",
+        json={"first_name": "Stats", "last_name": "One", "experience": 37},
+        headers=auth_headers,
+    ).json()["id"]
+    client.post(
+        "/candidates/bulk",
+        json=[
+            {"first_name": "Stats", "last_name": "Bulk", "experience": 38},
+            {"first_name": "Stats", "last_name": "Bulk", "experience": 38},
+        ],
+        headers=auth_headers,
+    )
+    assert stats_from_endpoint(client, auth_headers) == stats_from_candidates(test_db)
+
+    client.put(
+        f"/candidates/{created}",
+        json={"first_name": "Stats", "last_name": "One", "experience": 38},
+        headers=auth_headers,
+    )
+    _, histogram, _ = stats_from_endpoint(client, auth_headers)
+    assert 37 not in histogram
+    assert stats_from_endpoint(client, auth_headers) == stats_from_candidates(test_db)
+
+    client.delete(f"/candidates/{created}", headers=auth_headers)
+    assert stats_from_endpoint(client, auth_headers) == stats_from_candidates(test_db)
+
+    stats = client.get("/candidates/stats", headers=auth_headers).json()
+    experience = stats["experience"]
+    assert experience["min"] <= experience["percentiles"]["p50"] <= experience["max"]
+
+
+def test_refresh_candidate_stats_repairs_drift(client, auth_headers, test_db):
+    client.post(
+        "/candidates",
+        json={"first_name": "Drift", "last_name": "Stats", "experience": 39},
+        headers=auth_headers,
+    )
+    # A write that went around the triggers
+    test_db.execute(text("UPDATE candidate_stats SET candidates = candidates + 5"))
+    test_db.commit()
+    assert stats_from_endpoint(client, auth_headers) != stats_from_candidates(test_db)
+
+    assert refresh_candidate_stats(test_db) > 0
+    assert stats_from_endpoint(client, auth_headers) == stats_from_candidates(test_db)
+
+
+def test_histogram_percentiles():
+    histogram = [(1, 5), (2, 3), (10, 2)]
+    assert histogram_percentiles(histogram, (10, 50, 80, 90, 100)) == {
+        "p10": 1,
+        "p50": 1,
+        "p80": 2,
+        "p90": 10,
+        "p100": 10,
+    }
+    assert histogram_percentiles([]) == {}
+
+
+def test_fetch_all_candidates_projected_rows(client, auth_headers):
+    client.post(
+        "/candidates",
+        json={"first_name": "Projected", "last_name": "Row", "experience": 33},
+        headers=auth_headers,
+    )
+    for url in (
+        "/all-candidates?search_by_experience=33",
+        "/all-candidates?search_by_experience=33&pagination=cursor",
+    ):
+        response = client.get(url, headers=auth_headers)
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["etag"].startswith('"list-')
+        assert response.json()["candidates"] == [
+            {"first_name": "Projected", "last_name": "Row", "experience": 33}
+        ]
+
+
+def test_single_statement_writes(client, auth_headers):
+    candidate = {"first_name": "Returning", "last_name": "Row", "experience": 7}
+    candidate_id = client.post(
+        "/candidates", json=candidate, headers=auth_headers
+    ).json()["id"]
+    etag = client.get(f"/candidates/{candidate_id}", headers=auth_headers).headers[
+        "etag"
+    ]
+
+    # The If-Match list may name older versions too
+    response = client.put(
+        f"/candidates/{candidate_id}",
+        json={**candidate, "experience": 8},
+        headers={**auth_headers, "If-Match": f'"candidate-{candidate_id}-v0", {etag}'},
+    )
+    assert response.status_code == 200
+    assert response.json() == {**candidate, "experience": 8}
+    assert response.headers["etag"] == candidate_etag(candidate_id, 2)
+
+    missing = candidate_id + 1000
+    for headers in (auth_headers, {**auth_headers, "If-Match": etag}):
+        response = client.put(f"/candidates/{missing}", json=candidate, headers=headers)
+        assert response.json() == "Candidate not found"
+    assert (
+        client.delete(f"/candidates/{missing}", headers=auth_headers).json()
+        == "Candidate not found"
+    )
+
+    response = client.delete(f"/candidates/{candidate_id}", headers=auth_headers)
+    assert response.json() == {**candidate, "experience": 8}
+    response = client.get(f"/candidates/{candidate_id}", headers=auth_headers)
+    assert response.json() == "Candidate not found"
+
+
+def test_if_match_versions():
+    assert if_match_versions(None, 1) is None
+    assert if_match_versions("*", 1) is None
+    assert if_match_versions('"candidate-1-v3", W/"candidate-1-v4"', 1) == {3}
+    assert if_match_versions('W/"candidate-1-v3"', 1) == set()
+    assert if_match_versions('"candidate-2-v3", "list-abc"', 1) == set()
+
+
+def test_batch_update_and_delete(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(candidate_api, "BATCH_WRITE_CHUNK_SIZE", 2)
+    ids = [
+        client.post(
+            "/candidates",
+            json={
+                "first_name": f"Batch{i}",
+                "last_name": "Batchwrite",
+                "experience": 3,
+            },
+            headers=auth_headers,
+        ).json()["id"]
+        for i in range(5)
+    ]
+    # Cached before the batch write, must not be served stale afterwards
+    client.get(f"/candidates/{ids[0]}", headers=auth_headers)
+
+    response = client.patch(
+        "/candidates",
+        json={"search_by_name": "Batchwrite", "changes": {"experience": 23}},
+        headers=auth_headers,
+    )
+    assert response.json() == {"affected": 5, "ids": ids}
+    candidate = client.get(f"/candidates/{ids[0]}", headers=auth_headers).json()
+    assert candidate["experience"] == 23
+    assert candidate["first_name"] == "Batch0"
+
+    # Explicit ids are narrowed by the filters, unknown ids are skipped
+    response = client.patch(
+        "/candidates",
+        json={
+            "ids": [ids[0], ids[1], ids[-1] + 1000],
+            "search_by_experience": 23,
+            "changes": {"last_name": "Batchdone"},
+        },
+        headers=auth_headers,
+    )
+    assert response.json() == {"affected": 2, "ids": ids[:2]}
+
+    response = client.request(
+        "DELETE",
+        "/candidates",
+        json={"search_by_name": "Batchwrite", "search_by_experience": 23},
+        headers=auth_headers,
+    )
+    assert response.json() == {"affected": 3, "ids": ids[2:]}
+    response = client.request(
+        "DELETE", "/candidates", json={"ids": ids}, headers=auth_headers
+    )
+    assert response.json() == {"affected": 2, "ids": ids[:2]}
+    assert (
+        client.get(f"/candidates/{ids[0]}", headers=auth_headers).json()
+        == "Candidate not found"
+    )
+
+
+def test_batch_write_needs_a_selection(client, auth_headers):
+    response = client.request("DELETE", "/candidates", json={}, headers=auth_headers)
+    assert response.json() == "Pass ids or a search filter to select candidates"
+    response = client.patch(
+        "/candidates", json={"ids": [1], "changes": {}}, headers=auth_headers
+    )
+    assert response.json() == "No fields to update"
+
+
+def test_batch_update_rejects_null_fields(client, auth_headers):
+    response = client.patch(
+        "/candidates",
+        json={"ids": [1], "changes": {"experience": None}},
+        headers=auth_headers,
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "changes", "experience"]
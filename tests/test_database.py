@@ -0,0 +1,47 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+from app.main import app
+from app.database import pool_options
+from app.utils.pool import InstrumentedQueuePool
+
+client = TestClient(app)
+
+
+def test_health_reports_pool_stats():
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    pool = response.json()["database_pool"]
+    for key in ("checked_out", "overflow", "timeouts", "wait_seconds_max"):
+        assert key in pool
+
+
+def test_pool_options_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "true")
+
+    options = pool_options("postgresql+asyncpg://u:p@db/app", InstrumentedQueuePool)
+    assert options["pool_size"] == 3
+    assert options["pool_pre_ping"] is True
+    assert pool_options("sqlite://", InstrumentedQueuePool) == {}
+
+
+def test_pool_counts_checkout_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    with engine.connect():
+        assert engine.pool.status_dict()["checked_out"] == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = engine.pool.status_dict()
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.05
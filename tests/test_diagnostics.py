@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from app.main import app
+import app.api.admin as admin
+from app.api.user import get_current_user
+from app.utils.diagnostics import QueryDiagnostics, diagnostics
+from app.utils.metrics import RequestMetrics, current_request
+
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'diagnostics.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+    return engine
+
+
+def test_flags_repeated_statements_once_per_request(tmp_path):
+    engine = make_engine(tmp_path)
+    watcher = QueryDiagnostics(slow_query_ms=10_000, n_plus_one_threshold=2)
+    watcher.install(engine)
+
+    scope = {"type": "http", "method": "GET", "path": "/items"}
+    token = current_request.set(RequestMetrics(scope))
+    try:
+        with engine.connect() as conn:
+            for id in range(5):
+                conn.execute(text("SELECT name FROM items WHERE id = :id"), {"id": id})
+    finally:
+        current_request.reset(token)
+
+    findings = watcher.findings()
+    assert len(findings) == 1
+    assert findings[0]["kind"] == "n_plus_one"
+    assert findings[0]["count"] == 3
+    assert findings[0]["method"] == "GET"
+    assert "SEARCH items USING INTEGER PRIMARY KEY" in findings[0]["plan"][0]
+
+
+def test_flags_slow_statements_with_plan(tmp_path):
+    engine = make_engine(tmp_path)
+    watcher = QueryDiagnostics(slow_query_ms=0, n_plus_one_threshold=100)
+    watcher.install(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT * FROM items WHERE name LIKE '%x%'"))
+
+    findings = watcher.findings(kind="slow_query")
+    assert findings[0]["route"] is None
+    assert findings[0]["duration_ms"] >= 0
+    assert "SCAN items" in findings[0]["plan"][0]
+
+
+def test_admin_diagnostics_endpoint(monkeypatch):
+    monkeypatch.setattr(admin, "DIAGNOSTICS_ENABLED", True)
+    monkeypatch.setattr(admin, "ADMIN_USERNAMES", {"admin"})
+    diagnostics.record("slow_query", None, "SELECT 1", ["plan"], duration_ms=1.0)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(
+        username="admin"
+    )
+    try:
+        client = TestClient(app)
+        response = client.get("/admin/diagnostics?kind=slow_query")
+        assert response.status_code == 200
+        assert response.json()["findings"][0]["statement"] == "SELECT 1"
+
+        assert client.delete("/admin/diagnostics").status_code == 200
+        assert client.get("/admin/diagnostics").json()["findings"] == []
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_admin_diagnostics_needs_an_admin(monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_USERNAMES", {"admin"})
+    diagnostics.record("slow_query", None, "SELECT 1", ["plan"], duration_ms=1.0)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(
+        username="someone"
+    )
+    try:
+        client = TestClient(app)
+        monkeypatch.setattr(admin, "DIAGNOSTICS_ENABLED", True)
+        assert client.get("/admin/diagnostics").status_code == 403
+        assert client.delete("/admin/diagnostics").status_code == 403
+        assert diagnostics.findings()
+
+        monkeypatch.setattr(admin, "ADMIN_USERNAMES", {"admin", "someone"})
+        monkeypatch.setattr(admin, "DIAGNOSTICS_ENABLED", False)
+        assert client.get("/admin/diagnostics").status_code == 404
+        assert client.delete("/admin/diagnostics").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+        diagnostics.clear()
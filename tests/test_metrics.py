@@ -0,0 +1,45 @@
+import re
+import uuid
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.metrics import MetricsMiddleware
+
+client = TestClient(app)
+
+
+def test_metrics_record_route_latency_and_queries():
+    username = f"metrics-{uuid.uuid4().hex[:8]}"
+    client.post("/user", json={"username": username, "password": "password"})
+    client.get("/health")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/health",status="200"}'
+        in body
+    )
+    queries = re.search(
+        r'http_request_db_queries_total\{method="POST",route="/user"\} (\S+)', body
+    )
+    # A single INSERT ... ON CONFLICT DO NOTHING RETURNING
+    assert queries and float(queries.group(1)) == 1
+    assert 'db_pool_stat{stat="checked_out"}' in body
+
+
+def test_server_timing_header():
+    timed = FastAPI()
+    timed.add_middleware(MetricsMiddleware, server_timing=True)
+
+    @timed.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    response = TestClient(timed).get("/ping")
+    assert response.status_code == 200
+    assert re.match(
+        r'db;dur=[\d.]+;desc="0 queries", app;dur=[\d.]+, total;dur=[\d.]+',
+        response.headers["server-timing"],
+    )
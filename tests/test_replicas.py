@@ -0,0 +1,168 @@
+import shutil
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, MetaData, String, Table, create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import app.database as database
+import app.api.candidate as candidate_api
+import app.utils.replicas as replicas_module
+from app.main import app
+from app.database import Base, get_db
+from app.utils.cache import TTLCache
+from app.utils.replicas import STICKY_COOKIE, Replica, ReplicaSet, RoutingSession
+
+USER = {"username": "replica-user", "password": "replica-password"}
+
+
+def make_replica(path) -> Replica:
+    return Replica(
+        f"sqlite:///{path}",
+        create_engine(f"sqlite:///{path}"),
+        create_async_engine(f"sqlite+aiosqlite:///{path}"),
+    )
+
+
+@pytest.fixture
+def cluster(tmp_path, monkeypatch):
+    """A primary and a replica SQLite file, the replica a stale copy"""
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{primary}"))
+    Sessions = async_sessionmaker(
+        create_async_engine(f"sqlite+aiosqlite:///{primary}"),
+        autoflush=False,
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+    )
+
+    async def override_get_db():
+        async with Sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+    client.post("/user", json=USER)
+    token = client.post("/login", data=USER).json()["access_token"]
+    client.post(
+        "/candidates",
+        json={"first_name": "Before", "last_name": "Write", "experience": 17},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    # Replicate what is there so far, later writes only reach the primary
+    shutil.copy(primary, replica)
+    client.cookies.clear()
+    client.catch_up = lambda: shutil.copy(primary, replica)
+
+    monkeypatch.setattr(database.replicas, "replicas", [make_replica(replica)])
+    monkeypatch.setattr(database.replicas, "checked_at", None)
+    yield client, {"Authorization": f"Bearer {token}"}
+    app.dependency_overrides.clear()
+
+
+def listed_last_names(client, headers) -> list:
+    response = client.get("/all-candidates?search_by_experience=17", headers=headers)
+    return [candidate["last_name"] for candidate in response.json()["candidates"]]
+
+
+def test_reads_go_to_replica_until_the_client_writes(cluster):
+    client, headers = cluster
+    response = client.put(
+        "/candidates/1",
+        json={"first_name": "Before", "last_name": "Written", "experience": 17},
+        headers=headers,
+    )
+    assert response.json()["last_name"] == "Written"
+    assert STICKY_COOKIE in response.cookies
+
+    # Read your writes: the client stays on the primary
+    assert listed_last_names(client, headers) == ["Written"]
+    # Others read the replica, which has not caught up
+    client.cookies.clear()
+    assert listed_last_names(client, headers) == ["Write"]
+
+
+def test_replica_reads_do_not_fill_the_shared_cache(cluster, monkeypatch):
+    client, headers = cluster
+    monkeypatch.setattr(
+        candidate_api, "candidate_cache", TTLCache("candidate", 100, 300)
+    )
+    assert client.delete("/candidates/1", headers=headers).status_code == 200
+
+    # Another client still sees the row on the stale replica
+    client.cookies.clear()
+    assert client.get("/candidates/1", headers=headers).json()["last_name"] == "Write"
+
+    # Once the replica caught up nobody is served the deleted row
+    client.catch_up()
+    assert client.get("/candidates/1", headers=headers).json() == "Candidate not found"
+
+
+def test_lagging_replica_leaves_the_rotation(cluster, monkeypatch):
+    client, headers = cluster
+    client.put(
+        "/candidates/1",
+        json={"first_name": "Before", "last_name": "Written", "experience": 17},
+        headers=headers,
+    )
+    client.cookies.clear()
+    assert listed_last_names(client, headers) == ["Write"]
+
+    monkeypatch.setattr(replicas_module, "replica_lag", lambda conn: 60.0)
+    database.replicas.checked_at = None
+    assert listed_last_names(client, headers) == ["Written"]
+    (replica,) = client.get("/health").json()["replicas"].values()
+    assert replica == {"healthy": False, "lag_seconds": 60.0, "error": "lagging"}
+
+
+def test_down_replica_leaves_the_rotation(tmp_path):
+    live = tmp_path / "live.db"
+    create_engine(f"sqlite:///{live}").connect().close()
+    down = make_replica(tmp_path / "missing" / "down.db")
+    replicas = ReplicaSet([down, make_replica(live)], max_lag=5, check_interval=60)
+
+    assert {replicas.pick().name for _ in range(4)} == {f"sqlite:///{live}"}
+    assert down.healthy is False and "unable to open" in down.error
+    assert replicas.check_due() is False
+
+
+origin = Table("origin", MetaData(), Column("name", String))
+
+
+def origin_engines(tmp_path) -> tuple:
+    """A primary and a replica SQLite engine, each naming itself in origin"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((primary, "primary"), (replica, "replica")):
+        origin.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(origin.insert().values(name=name))
+    return primary, replica
+
+
+def origin_names(engine) -> set:
+    with engine.connect() as conn:
+        return set(conn.scalars(text("SELECT name FROM origin")))
+
+
+def test_routing_session_sticks_to_primary_after_a_write(tmp_path):
+    primary, replica = origin_engines(tmp_path)
+
+    with RoutingSession(bind=primary, info={"replica": replica}) as db:
+        assert db.scalar(text("SELECT name FROM origin")) == "replica"
+        db.execute(origin.delete().where(origin.c.name == "nobody"))
+        assert db.scalar(text("SELECT name FROM origin")) == "primary"
+
+
+def test_routing_session_sends_textual_and_raw_writes_to_primary(tmp_path):
+    primary, replica = origin_engines(tmp_path)
+
+    with RoutingSession(bind=primary, info={"replica": replica}) as db:
+        assert db.scalar(text("SELECT name FROM origin")) == "replica"
+        db.execute(text("INSERT INTO origin (name) VALUES ('text')"))
+        db.commit()
+    with RoutingSession(bind=primary, info={"replica": replica}) as db:
+        # Raw connections, as COPY uses, may write too
+        db.connection().execute(text("INSERT INTO origin (name) VALUES ('raw')"))
+        db.commit()
+
+    assert origin_names(primary) == {"primary", "text", "raw"}
+    assert origin_names(replica) == {"replica"}
@@ -0,0 +1,450 @@
+import os
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import time
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+import app.api.report as report
+import app.worker as worker
+from app.models.candidate import Candidate
+import app.models.user  # candidates.user_id references users
+from app.database import SessionLocal
+from app.main import app
+from app.utils.report import shard_ranges
+from app.utils.report_store import ReportStore
+from app.utils.cache import TTLCache
+from app.utils.progress import ProgressHub
+
+
+@pytest.fixture(scope="module")
+def candidates():
+    db = SessionLocal()
+    rows = [
+        Candidate(first_name=f"Report{i}", last_name="Row", experience=i)
+        for i in range(25)
+    ]
+    db.add_all(rows)
+    db.commit()
+    try:
+        yield [row.id for row in rows]
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ReportStore(str(tmp_path / "reports"), budget_bytes=10 * 1024 * 1024)
+    monkeypatch.setattr(report, "report_store", store)
+    return store
+
+
+def test_generate_report_streams_all_rows(candidates, store, monkeypatch):
+    monkeypatch.setattr(report, "REPORT_CHUNK_SIZE", 4)
+
+    report_path = worker.generate_report_task()
+
+    with open(report_path, newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["ID", "First Name", "Last Name", "Experience"]
+    assert [int(row[0]) for row in rows[1:]] == candidates
+    assert not os.listdir(store.tmp_dir)
+
+
+def test_generate_report_applies_only_changes(candidates, store, monkeypatch):
+    first_path = worker.generate_report_task()
+    first_sha = store.load_state("candidates")["sha256"]
+
+    with SessionLocal() as db:
+        db.get(Candidate, candidates[0]).first_name = "Renamed"
+        db.delete(db.get(Candidate, candidates[1]))
+        added = Candidate(first_name="Added", last_name="Row", experience=1)
+        db.add(added)
+        db.commit()
+        added_id = added.id
+
+    monkeypatch.setattr(worker, "write_report", None)  # full rebuilds would fail
+    report_path = worker.generate_report_task()
+    assert report_path != first_path
+    with open(report_path, newline="") as file:
+        rows = list(csv.reader(file))
+    ids = [int(row[0]) for row in rows[1:]]
+    assert ids == sorted(ids)
+    assert candidates[1] not in ids and added_id in ids
+    assert rows[1][1] == "Renamed"
+    state = store.load_state("candidates")
+    assert state["rows"] == len(rows) - 1
+    assert state["sha256"] != first_sha
+    assert report_path == store.path("candidates", state["sha256"], "csv")
+
+    # Nothing changed: the stored artifact is reused as is
+    inode = os.stat(report_path).st_ino
+    assert worker.generate_report_task() == report_path
+    assert os.stat(report_path).st_ino == inode
+    assert store.load_state("candidates")["sha256"] == state["sha256"]
+
+
+def test_sharded_report_matches_serial_build(candidates, tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
+    monkeypatch.setitem(worker.celery.conf, "task_always_eager", True)
+    monkeypatch.setattr(report, "REPORT_CHUNK_SIZE", 4)
+    serial_store = ReportStore(str(tmp_path / "serial"), 10 * 1024 * 1024)
+    monkeypatch.setattr(report, "report_store", serial_store)
+    serial_path = worker.generate_report_task.apply().get()
+
+    monkeypatch.setattr(report, "REPORT_SHARDS", 3)
+    sharded_store = ReportStore(str(tmp_path / "sharded"), 10 * 1024 * 1024)
+    monkeypatch.setattr(report, "report_store", sharded_store)
+    sharded_path = worker.generate_report_task.apply().get()
+
+    with open(serial_path, "rb") as serial, open(sharded_path, "rb") as sharded:
+        assert serial.read() == sharded.read()
+    assert not os.listdir(sharded_store.tmp_dir)
+    state = sharded_store.load_state("candidates")
+    assert state["sha256"] == report.file_sha256(serial_path)
+    completions = [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("Generating report task completed")
+    ]
+    # Serial and sharded builds both log their throughput
+    assert len(completions) == 2
+    assert all("rows/sec" in line for line in completions)
+
+
+def test_sharded_report_progress_adds_up_the_shards(candidates, store, monkeypatch):
+    monkeypatch.setitem(worker.celery.conf, "task_always_eager", True)
+    monkeypatch.setattr(report, "REPORT_SHARDS", 3)
+    monkeypatch.setattr(report, "REPORT_PROGRESS_EVERY", 2)
+    states = {}
+
+    def update_state(state, meta, task_id=None):
+        states[task_id or "root"] = (state, meta)
+
+    for task in (worker.generate_report_task, worker.export_report_shard):
+        monkeypatch.setattr(task, "update_state", update_state)
+    result = worker.generate_report_task.apply()
+    result.get()
+
+    # Each shard reports on its own id, the root lists them
+    shard_ids = states.pop("root")[1]["shards"]
+    assert shard_ids == [f"{result.id}-shard-{index}" for index in range(3)]
+    assert set(states) == set(shard_ids)
+
+    class RecordedTask:
+        def __init__(self, task_id):
+            if task_id == result.id:
+                task_id = "root"
+            self.state, self.info = states.get(task_id, ("PENDING", None))
+            self.result = self.info
+
+    states["root"] = ("PROGRESS", {"phase": "shards", "shards": shard_ids})
+    states[shard_ids[0]] = ("SUCCESS", {"index": 0, "path": "part", "rows": 9})
+    states.pop(shard_ids[2])
+    monkeypatch.setattr(report, "task_result", RecordedTask)
+    shard_rows = [9, states[shard_ids[1]][1]["rows"], 0]
+    assert report.task_progress(result.id) == {
+        "state": "PROGRESS",
+        "phase": "shards",
+        "rows": sum(shard_rows),
+        "shards": shard_rows,
+    }
+
+
+def test_shard_ranges_cover_ids_in_order():
+    assert shard_ranges(1, 10, 3) == [(1, 5), (5, 9), (9, 11)]
+    assert shard_ranges(7, 8, 4) == [(7, 8), (8, 9)]
+    assert shard_ranges(5, 5, 4) == [(5, 6)]
+
+
+def read_csv_rows(path):
+    with open(path, newline="") as file:
+        return [
+            [int(id), first_name, last_name, int(experience)]
+            for id, first_name, last_name, experience in list(csv.reader(file))[1:]
+        ]
+
+
+@pytest.mark.parametrize("report_format", ["gzip", "zstd", "ndjson", "parquet"])
+def test_generate_report_formats(candidates, store, report_format):
+    if not report.format_available(report_format):
+        pytest.skip(f"{report.REPORT_FORMATS[report_format].module} not installed")
+
+    path = worker.generate_report_task.apply(args=[report_format]).get()
+    assert path.endswith(report.REPORT_FORMATS[report_format].extension)
+    state = store.load_state("candidates")
+    expected = read_csv_rows(store.path("candidates", state["sha256"], "csv"))
+
+    if report_format == "gzip":
+        with gzip.open(path, "rt", newline="") as file:
+            rows = list(csv.reader(file))[1:]
+        rows = [[int(r[0]), r[1], r[2], int(r[3])] for r in rows]
+    elif report_format == "zstd":
+        import zstandard
+
+        with open(path, "rb") as file:
+            text = zstandard.ZstdDecompressor().stream_reader(file).read().decode()
+        rows = [
+            [int(r[0]), r[1], r[2], int(r[3])]
+            for r in csv.reader(text.splitlines()[1:])
+        ]
+    elif report_format == "ndjson":
+        with open(path) as file:
+            rows = [list(json.loads(line).values()) for line in file]
+    else:
+        import pyarrow.parquet as pq
+
+        rows = [list(row.values()) for row in pq.read_table(path).to_pylist()]
+    assert rows == expected
+
+    # Same content: the export is reused rather than rebuilt
+    inode = os.stat(path).st_ino
+    assert worker.generate_report_task.apply(args=[report_format]).get() == path
+    assert os.stat(path).st_ino == inode
+    assert store.stats()["hits"] >= 1
+
+
+def test_generate_report_rejects_unknown_format():
+    client = TestClient(app)
+    assert client.get("/generate-report?format=xlsx").status_code == 422
+
+
+def test_download_report_ranges(candidates, store, monkeypatch):
+    path = worker.generate_report_task.apply(args=["gzip"]).get()
+    with open(path, "rb") as file:
+        content = file.read()
+
+    class FinishedTask:
+        def __init__(self, task_id):
+            self.status, self.result = "SUCCESS", path
+
+    monkeypatch.setattr(report, "task_result", FinishedTask)
+    client = TestClient(app)
+
+    response = client.get("/download-report/task")
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.content == content
+    etag = response.headers["etag"]
+    assert etag.endswith('-gzip"')
+
+    response = client.get("/download-report/task", headers={"Range": "bytes=10-"})
+    assert response.status_code == 206
+    assert response.content == content[10:]
+    assert (
+        response.headers["content-range"]
+        == f"bytes 10-{len(content) - 1}/{len(content)}"
+    )
+
+    response = client.get(
+        "/download-report/task", headers={"Range": "bytes=-5", "If-Range": etag}
+    )
+    assert response.content == content[-5:]
+
+    # A stale validator gets the whole file
+    response = client.get(
+        "/download-report/task", headers={"Range": "bytes=0-1", "If-Range": '"old"'}
+    )
+    assert response.status_code == 200
+    assert response.content == content
+
+    response = client.get(
+        "/download-report/task", headers={"Range": f"bytes={len(content)}-"}
+    )
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(content)}"
+
+
+def test_report_store_evicts_least_recently_used(tmp_path):
+    store = ReportStore(str(tmp_path), budget_bytes=250)
+
+    def put(version):
+        path = store.temp_path()
+        with open(path, "w") as file:
+            file.write("x" * 100)
+        stored = store.put(path, "candidates", version, "csv")
+        os.utime(stored, (time.time() - 100 + len(os.listdir(store.objects_dir)),) * 2)
+        return stored
+
+    first, second = put("a"), put("b")
+    # Reading the first artifact makes the second the least recently used
+    assert store.get("candidates", "a", "csv") == first
+    third = put("c")
+
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+    stats = store.stats()
+    assert stats["artifacts"] == 2
+    assert stats["bytes"] == 200
+    assert stats["evictions"] == 1
+    assert store.get("candidates", "b", "csv") is None
+    assert store.describe(third) == ("candidates", "c", "csv")
+
+
+def test_report_store_keeps_the_incremental_base(tmp_path):
+    store = ReportStore(str(tmp_path), budget_bytes=0)
+    path = store.temp_path()
+    with open(path, "w") as file:
+        file.write("ID\n")
+    base = store.put(path, "candidates", "base", "csv")
+    store.save_state(
+        "candidates", {"sha256": "base", "rows": 0, "watermark": datetime.now()}
+    )
+    store.evict()
+    assert os.path.exists(base)
+
+
+def test_health_reports_report_store(store):
+    response = TestClient(app).get("/health")
+    assert response.json()["report_store"]["budget_bytes"] == 10 * 1024 * 1024
+
+
+def test_generate_report_joins_the_running_task(monkeypatch):
+    states, started = {}, []
+
+    class TrackedTask:
+        def __init__(self, task_id):
+            self.state = states.get(task_id, "PENDING")
+
+    monkeypatch.setattr(report, "task_result", TrackedTask)
+    monkeypatch.setattr(report, "has_result_backend", lambda: True)
+    monkeypatch.setattr(report, "inflight_reports", TTLCache("inflight", 10, 60))
+    monkeypatch.setattr(
+        worker.generate_report_task,
+        "apply_async",
+        lambda args, task_id: started.append((args, task_id)),
+    )
+    client = TestClient(app)
+
+    first = client.get("/generate-report?format=gzip").json()
+    second = client.get("/generate-report?format=gzip").json()
+    assert second == {
+        "task_id": first["task_id"],
+        "message": "Report generation already in progress.",
+    }
+    assert client.get("/generate-report").json()["task_id"] != first["task_id"]
+    assert len(started) == 2
+
+    # Once it has finished, the next request starts a new build
+    states[first["task_id"]] = "SUCCESS"
+    third = client.get("/generate-report?format=gzip").json()
+    assert third["task_id"] != first["task_id"]
+    assert len(started) == 3
+
+
+def test_generate_report_replaces_a_lost_task(monkeypatch):
+    started = []
+
+    class LostTask:
+        def __init__(self, task_id):
+            self.state = "PENDING"
+
+    monkeypatch.setattr(report, "task_result", LostTask)
+    monkeypatch.setattr(report, "has_result_backend", lambda: True)
+    monkeypatch.setattr(report, "inflight_reports", TTLCache("inflight", 10, 60))
+    monkeypatch.setattr(
+        worker.generate_report_task,
+        "apply_async",
+        lambda args, task_id: started.append(task_id),
+    )
+    client = TestClient(app)
+
+    first = client.get("/generate-report").json()
+    # Queued moments ago, PENDING is still expected
+    assert client.get("/generate-report").json()["task_id"] == first["task_id"]
+
+    # Still PENDING past the grace period, the worker or message is gone
+    monkeypatch.setattr(report, "REPORT_PENDING_GRACE", -1)
+    second = client.get("/generate-report").json()
+    assert second["message"] == "Report generation started."
+    assert started == [first["task_id"], second["task_id"]]
+
+
+def test_generate_report_without_result_backend_starts_each_build(monkeypatch):
+    if report.has_result_backend():
+        pytest.skip("CELERY_RESULT_BACKEND is set")
+    started = []
+    monkeypatch.setattr(report, "inflight_reports", TTLCache("inflight", 10, 60))
+    monkeypatch.setattr(
+        worker.generate_report_task,
+        "apply_async",
+        lambda args, task_id: started.append(task_id),
+    )
+    client = TestClient(app)
+
+    responses = [client.get("/generate-report?format=gzip") for _ in range(2)]
+    assert [response.json()["message"] for response in responses] == [
+        "Report generation started."
+    ] * 2
+    assert [response.json()["task_id"] for response in responses] == started
+    assert len(set(started)) == 2
+
+
+def test_generate_report_publishes_row_progress(candidates, store, monkeypatch):
+    updates = []
+    monkeypatch.setattr(report, "REPORT_PROGRESS_EVERY", 10)
+    monkeypatch.setattr(
+        worker.generate_report_task,
+        "update_state",
+        lambda **kwargs: updates.append(kwargs),
+    )
+
+    result = worker.generate_report_task.apply()
+    assert result.get().endswith(".csv")
+    assert updates[0] == {
+        "task_id": result.id,
+        "state": "PROGRESS",
+        "meta": {"phase": "export", "rows": 10},
+    }
+    assert [update["meta"]["rows"] for update in updates] == [
+        10 * (i + 1) for i in range(len(updates))
+    ]
+
+
+def test_progress_hub_polls_once_per_task():
+    states = iter(
+        [
+            {"state": "PENDING"},
+            {"state": "PROGRESS", "rows": 10},
+            {"state": "PROGRESS", "rows": 10},
+            {"state": "SUCCESS"},
+        ]
+    )
+    fetches = []
+
+    def fetch(task_id):
+        fetches.append(task_id)
+        return next(states)
+
+    async def listen(hub):
+        return [event async for event in hub.subscribe("task")]
+
+    async def scenario():
+        hub = ProgressHub(fetch, interval=0.01)
+        events = await asyncio.gather(listen(hub), listen(hub))
+        return hub, events
+
+    hub, (first, second) = asyncio.run(scenario())
+    assert first == second
+    assert [event["state"] for event in first] == ["PENDING", "PROGRESS", "SUCCESS"]
+    assert len(fetches) == 4
+    assert hub.watching() == 0
+
+
+def test_report_progress_streams_server_sent_events(monkeypatch):
+    class FinishedTask:
+        def __init__(self, task_id):
+            self.state, self.info = "SUCCESS", None
+
+    monkeypatch.setattr(report, "task_result", FinishedTask)
+    with TestClient(app).stream("GET", "/report-progress/abc") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    assert body == (
+        'event: done\ndata: {"state": "SUCCESS", '
+        '"download_url": "/download-report/abc"}\n\n'
+    )
@@ -0,0 +1,35 @@
+import pytest
+from benchmarks.startup import (
+    FIRST_RESPONSE_BUDGET_MS,
+    IMPORT_BUDGET_MS,
+    first_response,
+    import_profile,
+)
+
+
+@pytest.fixture(scope="module")
+def startups():
+    return [first_response() for _ in range(3)]
+
+
+def test_import_leaves_subsystems_for_first_use(startups):
+    for startup in startups:
+        assert startup["status"] == 200
+        assert startup["loaded"] == []
+        assert startup["engines_created"] is False
+
+
+def test_startup_within_budget(startups):
+    # Best of the runs, the others may have shared the CPU with something else
+    assert min(startup["import_ms"] for startup in startups) <= IMPORT_BUDGET_MS
+    assert (
+        min(startup["first_response_ms"] for startup in startups)
+        <= FIRST_RESPONSE_BUDGET_MS
+    )
+
+
+def test_import_profile_breaks_down_by_package():
+    total, packages = import_profile()
+    assert total > 0
+    assert "fastapi" in packages and "app" in packages
+    assert "celery" not in packages
@@ -1,9 +1,12 @@
 import pytest
+import threading
 from fastapi.testclient import TestClient
 from app.main import app
 from app.models.user import User
 from app.database import SessionLocal
+import app.utils.helper as helper
 from app.utils.helper import hash_password
+from app.api.user import principal_cache
 
 client = TestClient(app)
 
@@ -67,3 +70,27 @@ def test_login_invalid_credentials(db_session):
 
     assert response.status_code == 400
     assert "Invalid credentials" in response.json()["detail"]
+
+
+# Test that the principal is resolved from the cache after the first request
+def test_get_me_uses_principal_cache(create_user):
+    login_data = {"username": "testuser", "password": "testpassword"}
+    token = client.post("/login", data=login_data).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    client.get("/me", headers=headers)
+    hits = principal_cache.hits
+    response = client.get("/me", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["username"] == "testuser"
+    assert principal_cache.hits == hits + 1
+
+
+# Test that login fails fast instead of queueing when the hashing pool is full
+def test_login_busy_hash_pool(create_user, monkeypatch):
+    monkeypatch.setattr(helper, "_hash_slots", threading.BoundedSemaphore(0))
+    login_data = {"username": "testuser", "password": "testpassword"}
+    response = client.post("/login", data=login_data)
+
+    assert response.status_code == 503